@@ -1,10 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.routers import analyze, generate, upload, recommend, chat
+from app.services.job_queue import job_queue
+from app.utils.similarity_search import get_index, warm_up_clients, close_async_clients
 
-app = FastAPI()
 # uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
 
+READINESS_RETRY_SECONDS = 5
+
+# 준비 항목 → "pending" / "ready" / 마지막 실패 사유 (/readyz 에서 확인)
+readiness = {}
+
+
+async def _prepare(name: str, prepare):
+    """
+    준비 작업 하나 실행 - 실패하면 READINESS_RETRY_SECONDS 후 다시 시도
+    """
+    readiness[name] = "pending"
+    while True:
+        try:
+            await prepare()
+            readiness[name] = "ready"
+            print(f"[준비 완료] {name}")
+            return
+        except Exception as e:
+            readiness[name] = f"failed: {e}"
+            print(f"[준비 실패] {name}: {e}")
+            await asyncio.sleep(READINESS_RETRY_SECONDS)
+
+
+async def warm_up():
+    """
+    분석 워커(YOLO 로딩) / 벡터 인덱스 연결 / OpenAI 클라이언트를 동시에 준비
+    """
+    await asyncio.gather(
+        _prepare("analysis_workers", job_queue.warm_up),
+        _prepare("vector_index", lambda: asyncio.to_thread(get_index)),
+        _prepare("openai", lambda: asyncio.to_thread(warm_up_clients)),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 준비 작업은 백그라운드에서 진행하고 서버는 바로 기동 (준비 상태는 /readyz)
+    job_queue.start()
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    job_queue.shutdown()
+    # OpenAI 비동기 클라이언트 keep-alive 커넥션 정리
+    await close_async_clients()
+
+
+app = FastAPI(lifespan=lifespan)
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,4 +75,22 @@ app.include_router(chat.router, prefix="/chat", tags=["Chat"])
 
 @app.get("/")
 def root():
-    return {"message": "Traffic Accident Analysis API Running"}
\ No newline at end of file
+    return {"message": "Traffic Accident Analysis API Running"}
+
+@app.get("/healthz")
+def healthz():
+    """
+    liveness - 프로세스가 요청을 처리할 수 있으면 200 (외부 의존성은 확인하지 않음)
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """
+    readiness - 분석 워커/벡터 인덱스/OpenAI 클라이언트 준비가 모두 끝났으면 200, 아니면 503
+    """
+    ready = bool(readiness) and all(state == "ready" for state in readiness.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "checks": readiness},
+    )
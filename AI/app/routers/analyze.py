@@ -1,155 +1,239 @@
-from fastapi import APIRouter, UploadFile, File, Form, Body
-import os
-import uuid
-from app.services.vehicle_to_vehicle import VehicleToVehicleAnalyzer
-from app.services.vehicle_to_pedestrian import VehicleToPedestrianAnalyzer
+from fastapi import APIRouter, UploadFile, File, Form, Body, HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from app.services.analysis_runner import run_analysis, analysis_version, SUPPORTED_ACCIDENT_TYPES
+from app.services.job_queue import job_queue, QueueFullError
+from app.utils.video_store import video_store
+from app.utils.result_cache import result_cache
+from app.utils.situation_templates import SENTENCE_MODES, SITUATION_SENTENCE_MODE
+from app.utils.session_store import session_store, load_session_payload
 from app.utils.similarity_search import (
-    convert_analysis_to_sentence,
-    query_similar_cases,
-    generate_fault_explanation_gpt,
-    generate_question_gpt,
-    update_analysis_with_answer
+    convert_analysis_to_sentence_async,
+    query_similar_cases_async,
+    generate_fault_explanation_gpt_async,
+    generate_question_gpt_async,
+    update_analysis_with_answer_async
 )
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploaded_videos"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+async def build_analysis_response(results: dict, use_cache: bool = True, sentence_mode: str = None,
+                                  state: dict = None) -> dict:
+    """
+    분석 결과 → 판독불가 항목이 없으면 유사 사례 검색 + 설명 생성, 있으면 질문 생성
+    - use_cache=False 면 GPT 응답 캐시를 쓰지 않고 새로 생성
+    - sentence_mode: 상황 문장 생성 방식 (gpt / template / auto)
+    - OpenAI/Pinecone 호출은 비동기 클라이언트로 처리해 이벤트 루프를 막지 않음
+    - state: 넘기면 응답에 없는 중간 결과(situation_sentence)를 채워 줌 (세션 저장용)
+    """
+    # 판독불가 항목 체크
+    uncertain_items = [key for key, value in results.items() 
+                     if isinstance(value, str) and "판단불가" in value]
+    
+    if not uncertain_items:
+        # 판독불가 항목이 없는 경우, 유사도 검색 및 설명 생성
+        situation_sentence = await convert_analysis_to_sentence_async(results, use_cache=use_cache, mode=sentence_mode)
+        similar_cases = await query_similar_cases_async(situation_sentence)
+        
+        print("situation_sentence:", situation_sentence)
+        if state is not None:
+            state["situation_sentence"] = situation_sentence
+
+        if similar_cases and len(similar_cases) > 0:
+            similar_case = similar_cases[0]
+            explanation = await generate_fault_explanation_gpt_async(situation_sentence, similar_case, use_cache=use_cache)
+            
+            print("[결과 반환]")
+
+            return {
+                "analysis": results,
+                "similar_case": similar_case,
+                "explanation": explanation,
+                "question": None,
+                "needs_confirmation": False,
+                "uncertain_items": []
+            }
+        else:
+
+            print("[결과 반환]")
+
+            return {
+                "analysis": results,
+                "similar_case": None,
+                "explanation": "유사한 사례를 찾을 수 없어 과실 판단이 어렵습니다.",
+                "question": None,
+                "needs_confirmation": False,
+                "uncertain_items": []
+            }
+    
+    # 판독불가 항목이 있는 경우, GPT로 질문 생성
+    question = await generate_question_gpt_async(results, uncertain_items, use_cache=use_cache)
+    
+    return {
+        "analysis": results,
+        "similar_case": None,
+        "explanation": None,
+        "question": question,
+        "needs_confirmation": True,
+        "uncertain_items": uncertain_items
+    }
+
+
+def _save_session(response: dict, session_id: str = None, situation_sentence: str = None) -> dict:
+    """
+    분석 응답을 세션에 저장하고 session_id 를 붙여 반환
+    - 후속 요청(/update-analysis, /chat, /recommend)은 session_id 만 보내면 됨
+    - session_id 가 있으면 기존 세션 갱신 (대화 기록은 유지)
+    """
+    state = {
+        "analysis": response["analysis"],
+        "similar_case": response["similar_case"],
+        "explanation": response["explanation"],
+        "question": response["question"],
+        "uncertain_items": response["uncertain_items"],
+        "situation_sentence": situation_sentence,
+    }
+    if session_id:
+        session_store.update(session_id, **state)
+    else:
+        session_id = session_store.create({**state, "conversation_history": []})
+    return {**response, "session_id": session_id}
+
+
+def _resolve_sentence_mode(sentence_mode: Optional[str]) -> str:
+    sentence_mode = sentence_mode or SITUATION_SENTENCE_MODE
+    if sentence_mode not in SENTENCE_MODES:
+        raise ValueError(f"sentence_mode 는 {', '.join(SENTENCE_MODES)} 중 하나여야 합니다.")
+    return sentence_mode
+
+
+async def _submit_analysis_job(
+    video: Optional[UploadFile],
+    video_id: Optional[str],
+    accident_type: str,
+    road_type: str,
+    use_cache: bool = True,
+    sentence_mode: Optional[str] = None,
+) -> str:
+    if accident_type not in SUPPORTED_ACCIDENT_TYPES:
+        raise ValueError("지원하지 않는 사고 유형입니다.")
+    sentence_mode = _resolve_sentence_mode(sentence_mode)
+
+    if video is not None:
+        # 새 영상 업로드 (같은 내용이면 기존 파일 재사용)
+        saved = await video_store.save(video)
+        video_id, filepath = saved["video_id"], saved["video_path"]
+    elif video_id:
+        # /upload/video 로 저장해 둔 영상 사용
+        filepath = await run_in_threadpool(video_store.path, video_id)
+        if filepath is None:
+            raise HTTPException(status_code=404, detail="존재하지 않는 video_id 입니다.")
+    else:
+        raise ValueError("video 또는 video_id 중 하나가 필요합니다.")
+
+    # 같은 영상 + 같은 조건의 분석 결과가 있으면 바로 반환 (use_cache=False 면 새로 분석)
+    cache_key = result_cache.make_key(video_id, accident_type, road_type, f"{analysis_version()}:{sentence_mode}")
+    cached = await run_in_threadpool(result_cache.get, cache_key) if use_cache else None
+    if cached is not None:
+        print("[분석 결과 캐시 적중]")
+        return job_queue.complete(await run_in_threadpool(_save_session, cached))
+
+    async def finalize_and_cache(results: dict) -> dict:
+        state = {}
+        response = await build_analysis_response(results, use_cache, sentence_mode, state)
+        # 캐시에는 세션과 무관한 응답만 저장 (적중 시 새 세션 발급)
+        await run_in_threadpool(result_cache.put, cache_key, response)
+        return await run_in_threadpool(_save_session, response, situation_sentence=state.get("situation_sentence"))
+
+    try:
+        return job_queue.submit(run_analysis, filepath, accident_type, road_type, on_result=finalize_and_cache)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
 
 @router.post("/video")
 async def analyze_video(
-    video: UploadFile = File(...),
+    video: Optional[UploadFile] = File(None),
+    video_id: Optional[str] = Form(None),
     accident_type: str = Form(...),
     road_type: str = Form(...),
+    use_cache: bool = Form(True),
+    sentence_mode: Optional[str] = Form(None),
 ):
-    filename = f"{uuid.uuid4().hex}_{video.filename}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    with open(filepath, "wb") as f:
-        f.write(await video.read())
-
-    if accident_type == "차대차":
-        analyzer = VehicleToVehicleAnalyzer(filepath, accident_type, road_type)
-    elif accident_type == "차대보행자":
-        analyzer = VehicleToPedestrianAnalyzer(filepath, accident_type, road_type)
-    else:
-        return {"error": "지원하지 않는 사고 유형입니다."}
+    """
+    분석 작업을 워커 프로세스에 맡기고 완료될 때까지 기다렸다가 결과 반환
+    - video 대신 /upload/video 에서 받은 video_id 로 재업로드 없이 분석 가능
+    - use_cache=false 면 캐시된 분석 결과/GPT 응답을 쓰지 않고 새로 생성
+    - sentence_mode=template 이면 상황 문장을 GPT 대신 템플릿으로 생성
+    - 응답의 session_id 로 후속 요청에서 분석 결과/설명을 다시 보내지 않아도 됨
+    """
+    try:
+        job_id = await _submit_analysis_job(video, video_id, accident_type, road_type, use_cache, sentence_mode)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    job = await job_queue.wait(job_id)
+    if job["status"] == "failed":
+        return {"error": job["error"]}
+    return job["result"]
 
+
+@router.post("/jobs", status_code=202)
+async def create_analysis_job(
+    video: Optional[UploadFile] = File(None),
+    video_id: Optional[str] = Form(None),
+    accident_type: str = Form(...),
+    road_type: str = Form(...),
+    use_cache: bool = Form(True),
+    sentence_mode: Optional[str] = Form(None),
+):
+    """
+    분석 작업 등록 후 job_id 즉시 반환 (결과는 /analyze/jobs/{job_id} 로 조회)
+    """
     try:
-        results = analyzer.analyze()
-        
-        # 판독불가 항목 체크
-        uncertain_items = [key for key, value in results.items() 
-                         if isinstance(value, str) and "판단불가" in value]
-        
-        if not uncertain_items:
-            # 판독불가 항목이 없는 경우, 유사도 검색 및 설명 생성
-            situation_sentence = convert_analysis_to_sentence(results)
-            similar_cases = query_similar_cases(situation_sentence)
-            
-            print("situation_sentence:", situation_sentence)
-
-            if similar_cases and len(similar_cases) > 0:
-                similar_case = similar_cases[0]
-                explanation = generate_fault_explanation_gpt(situation_sentence, similar_case)
-                
-                return {
-                    "analysis": results,
-                    "similar_case": similar_case,
-                    "explanation": explanation,
-                    "question": None,
-                    "needs_confirmation": False,
-                    "uncertain_items": []
-                }
-            else:
-                return {
-                    "analysis": results,
-                    "similar_case": None,
-                    "explanation": "유사한 사례를 찾을 수 없어 과실 판단이 어렵습니다.",
-                    "question": None,
-                    "needs_confirmation": False,
-                    "uncertain_items": []
-                }
-        
-        # 판독불가 항목이 있는 경우, GPT로 질문 생성
-        question = generate_question_gpt(results, uncertain_items)
-        
-        return {
-            "analysis": results,
-            "similar_case": None,
-            "explanation": None,
-            "question": question,
-            "needs_confirmation": True,
-            "uncertain_items": uncertain_items
-        }
-    except Exception as e:
+        job_id = await _submit_analysis_job(video, video_id, accident_type, road_type, use_cache, sentence_mode)
+    except ValueError as e:
         return {"error": str(e)}
 
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+def get_analysis_job(job_id: str):
+    """
+    분석 작업 상태 조회 - 완료(done) 시 result 에 /analyze/video 와 같은 응답 포함
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="존재하지 않는 작업입니다.")
+    return job
+
 @router.post("/update-analysis")
 async def update_analysis(payload: dict = Body(...)):
     """
     사용자의 응답을 받아 분석 결과를 업데이트하고, 
     판독불가 항목이 없어진 경우 유사도 검색 및 설명을 생성
+    - session_id 를 보내면 analysis / uncertain_items 는 세션에 저장된 값 사용 (answer 만 보내면 됨)
     """
     print("update_analysis 호출됨")
     try:
+        payload = await run_in_threadpool(load_session_payload, payload)
         analysis = payload.get("analysis")
         answer = payload.get("answer")
         uncertain_items = payload.get("uncertain_items")
+        use_cache = payload.get("use_cache", True)
+        sentence_mode = _resolve_sentence_mode(payload.get("sentence_mode"))
 
         if not all([analysis, answer, uncertain_items]):
             return {"error": "필수 필드가 누락되었습니다."}
 
         # 사용자 응답을 기반으로 분석 결과 업데이트
-        updated_analysis = update_analysis_with_answer(analysis, answer, uncertain_items)
-        
-        # 업데이트된 결과에서 판독불가 항목 재확인
-        remaining_uncertain = [key for key, value in updated_analysis.items() 
-                            if isinstance(value, str) and "판단불가" in value]
-        
-        if not remaining_uncertain:
-            # 판독불가 항목이 모두 해결된 경우, 유사도 검색 및 설명 생성
-            situation_sentence = convert_analysis_to_sentence(updated_analysis)
-            similar_cases = query_similar_cases(situation_sentence)
-
-            print("situation_sentence:", situation_sentence)
-            
-            if similar_cases and len(similar_cases) > 0:
-                similar_case = similar_cases[0]
-                explanation = generate_fault_explanation_gpt(situation_sentence, similar_case)
-                
-                print("[결과 반환]")
-
-                return {
-                    "analysis": updated_analysis,
-                    "similar_case": similar_case,
-                    "explanation": explanation,
-                    "question": None,
-                    "needs_confirmation": False,
-                    "uncertain_items": []
-                }
-            else:
-
-                print("[결과 반환]")
-
-                return {
-                    "analysis": updated_analysis,
-                    "similar_case": None,
-                    "explanation": "유사한 사례를 찾을 수 없어 과실 판단이 어렵습니다.",
-                    "question": None,
-                    "needs_confirmation": False,
-                    "uncertain_items": []
-                }
-        
-        # 아직 판독불가 항목이 남아있는 경우, 새로운 질문 생성
-        question = generate_question_gpt(updated_analysis, remaining_uncertain)
+        updated_analysis = await update_analysis_with_answer_async(analysis, answer, uncertain_items)
         
-        return {
-            "analysis": updated_analysis,
-            "similar_case": None,
-            "explanation": None,
-            "question": question,
-            "needs_confirmation": True,
-            "uncertain_items": remaining_uncertain
-        }
+        # 업데이트된 결과에서 판독불가 항목 재확인 후 유사도 검색/설명 또는 새로운 질문 생성
+        state = {}
+        response = await build_analysis_response(updated_analysis, use_cache, sentence_mode, state)
+        return await run_in_threadpool(_save_session, response, payload.get("session_id"), state.get("situation_sentence"))
     except Exception as e:
         return {"error": str(e)}
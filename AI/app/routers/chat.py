@@ -1,71 +1,126 @@
 from fastapi import APIRouter, Body
-from openai import OpenAI
-import os
+from starlette.concurrency import run_in_threadpool
+from app.utils.similarity_search import chat_completion_async, stream_chat_completion
+from app.utils.chat_context import chat_context
+from app.utils.sse import sse_response
+from app.utils.session_store import session_store, load_session_payload, SessionNotFound
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def _validate_followup(payload: dict):
+    """
+    필수 항목이 없으면 오류 메시지, 모두 있으면 None
+    """
+    if not payload.get("analysis"):
+        return "no analysis"
+    
+    if not payload.get("explanation"):
+        return "no explanation"
+    
+    if not payload.get("message"):
+        return "no question"
+
+    print("분석 결과:", payload.get("analysis"))
+    print("설명:", payload.get("explanation"))
+    print("질문:", payload.get("message"))
+    print("대화 내용:", payload.get("conversation_history", []))
+    return None
+
+
+async def _build_messages(payload: dict, summary_state: dict) -> list:
+    """
+    ChatContext 로 GPT 메시지 구성 - 세션이면 저장된 대화 요약에 이어서 요약
+    """
+    session_id = payload.get("session_id")
+    return await chat_context.build_messages_async(
+        payload["analysis"],
+        payload["explanation"],
+        payload.get("conversation_history", []),
+        payload["message"],
+        summary=payload.get("chat_summary") if session_id else None,
+        summary_upto=(payload.get("summary_upto") or 0) if session_id else 0,
+        state=summary_state,
+    )
+
+
+def _record_turn(payload: dict, answer: str, summary_state: dict):
+    """
+    세션으로 들어온 질문이면 질문/답변과 갱신된 대화 요약을 세션에 저장
+    """
+    session_id = payload.get("session_id")
+    if not session_id:
+        return
+    history = payload.get("conversation_history", []) + [
+        {"role": "user", "content": payload["message"]},
+        {"role": "assistant", "content": answer},
+    ]
+    try:
+        session_store.update(session_id, conversation_history=history, **summary_state)
+    except SessionNotFound as e:
+        print(f"[세션 만료] {e}")
+
 
 @router.post("/ask-followup")
-def ask_followup(payload: dict = Body(...)):
+async def ask_followup(payload: dict = Body(...)):
     """
     사용자 분석 결과와 추가 질문을 받아 GPT를 통해 자연스러운 설명 생성
+    - 이전 대화는 최근 몇 턴만 그대로 보내고 나머지는 요약해서 전달 (ChatContext)
+    - session_id 를 보내면 analysis / explanation / 대화 기록은 세션에서 가져오고 이번 질문/답변도 세션에 기록
     """
     print("질문 들어옴")
 
-    analysis = payload.get("analysis", {})
-    explanation = payload.get("explanation", "")
-    message = payload.get("message", "")
-    conversation_history = payload.get("conversation_history", [])
+    try:
+        payload = await run_in_threadpool(load_session_payload, payload)
+    except SessionNotFound as e:
+        return {"error": str(e)}
 
-    if not analysis:
-        return {"error": "no analysis"}
-    
-    if not explanation:
-        return {"error": "no explanation"}
-    
-    if not message:
-        return {"error": "no question"}
-
-    print("분석 결과:", analysis)
-    print("설명:", explanation)
-    print("질문:", message)
-    print("대화 내용:", conversation_history)
-
-    # messages 구성
-    messages = [{"role": "system", "content": "당신은 교통사고 과실 판단 전문가입니다."}]
-
-    # 이전 대화 삽입 (각 항목이 role, content 구조로 되어 있어야 함)
-    for entry in conversation_history:
-        if "role" in entry and "content" in entry:
-            messages.append({"role": entry["role"], "content": entry["content"]})
-
-    # 새로운 질문 추가
-    messages.append({
-        "role": "user",
-        "content": f"""
-    다음은 한 사용자의 교통사고 분석 결과입니다:
-
-    분석결과 -> {analysis}
-    해당 사고에 대한 과실예측 -> {explanation}
-
-    사용자가 이에 대해 다음과 같은 질문을 했습니다:
-    \"{message}\"
-
-    이 사고 분석 결과를 바탕으로, 사용자의 질문에 대해 교통사고 과실 판단 전문가로서 자연스럽고 정확하게 설명해 주세요.
-    대화는 지금이 처음 아니기 때문에 이전에도 대화하듯이 해도 됩니다 (인삿말은 필요 없음).
-    이전 대화 내용에서의 질문과 답변을 바탕으로, 사용자가 이해할 수 있도록 설명해 주세요.
-    참고로 사용자의 차량이 A이고, 상대 차량이 B입니다.
-    """
-    })
+    error = _validate_followup(payload)
+    if error:
+        return {"error": error}
 
-    # GPT 호출
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=messages
-    )
+    summary_state = {}
+    messages = await _build_messages(payload, summary_state)
+
+    # GPT 호출 (후속 질문은 대화 흐름마다 달라서 캐시된 응답을 쓰지 않음)
+    content = await chat_completion_async(messages, use_cache=False)
 
-    print("GPT 응답:", response.choices[0].message.content.strip())
+    print("GPT 응답:", content.strip())
+    await run_in_threadpool(_record_turn, payload, content.strip(), summary_state)
 
     return {
-        "response": response.choices[0].message.content.strip()
+        "response": content.strip()
     }
+
+
+@router.post("/ask-followup/stream")
+async def ask_followup_stream(payload: dict = Body(...)):
+    """
+    /ask-followup 스트리밍 버전 (SSE)
+    - delta: {"content": 토큰 조각} 을 생성되는 대로 전달
+    - done: {"response": 전체 응답, "usage": 토큰 사용량}
+    - error: {"error": 메시지}
+    """
+    print("질문 들어옴 (스트리밍)")
+
+    try:
+        payload = await run_in_threadpool(load_session_payload, payload)
+    except SessionNotFound as e:
+        return {"error": str(e)}
+
+    error = _validate_followup(payload)
+    if error:
+        return {"error": error}
+
+    summary_state = {}
+    messages = await _build_messages(payload, summary_state)
+
+    async def events():
+        # 후속 질문은 대화 흐름마다 달라서 /ask-followup 과 같이 캐시된 응답을 쓰지 않음
+        async for event, data in stream_chat_completion(messages, use_cache=False):
+            if event == "done":
+                print("GPT 응답:", data["content"].strip())
+                data = {"response": data["content"].strip(), "usage": data["usage"]}
+                await run_in_threadpool(_record_turn, payload, data["response"], summary_state)
+            yield event, data
+
+    return sse_response(events())
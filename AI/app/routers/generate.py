@@ -5,6 +5,7 @@ from app.utils.openai_util import (
     generate_uncertain_questions,
     merge_user_answers
 )
+from app.utils.session_store import session_store, load_session_payload, SessionNotFound
 
 router = APIRouter()
 
@@ -33,7 +34,13 @@ def handle_uncertain(payload: dict = Body(...)):
     """
     판단불가 항목만 사용자에게 질문하고,
     응답이 들어오면 해당 항목만 반영하여 최종 결과 반환
+    - session_id 를 보내면 analysis 는 세션에서 가져오고, 반영한 결과를 세션에 저장
     """
+    try:
+        payload = load_session_payload(payload)
+    except SessionNotFound as e:
+        return {"error": str(e)}
+
     analysis = payload.get("analysis", {})
     user_answers = payload.get("user_answers", {})
 
@@ -55,6 +62,13 @@ def handle_uncertain(payload: dict = Body(...)):
             if k in uncertain_keys:
                 final_result[k] = v
 
+        if payload.get("session_id"):
+            remaining = [key for key in uncertain_keys if key not in user_answers]
+            try:
+                session_store.update(payload["session_id"], analysis=final_result, uncertain_items=remaining)
+            except SessionNotFound as e:
+                print(f"[세션 만료] {e}")
+
         return {
             "status": "complete",
             "final_result": final_result
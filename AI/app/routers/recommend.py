@@ -1,25 +1,72 @@
 from fastapi import APIRouter, Body
+from starlette.concurrency import run_in_threadpool
 from app.utils.similarity_search import (
-    convert_analysis_to_sentence,
-    query_similar_cases,
-    generate_fault_response_gpt,
-    generate_fault_explanation_gpt
+    convert_analysis_to_sentence_async,
+    query_similar_cases_async,
+    generate_fault_response_gpt_async,
+    generate_fault_explanation_gpt_async,
+    stream_fault_explanation_gpt
 )
+from app.utils.sse import sse_response
+from app.utils.session_store import session_store, load_session_payload, SessionNotFound
 
 router = APIRouter()
 
+
+async def _load_payload(payload: dict) -> dict:
+    """
+    session_id 가 있으면 세션 값으로 payload 를 채움
+    - query_summary: 세션의 situation_sentence 재사용 (analysis 를 새로 보냈거나 문장이 없으면 새로 생성해 세션에 저장)
+    """
+    session_id = payload.get("session_id")
+    merged = await run_in_threadpool(load_session_payload, payload)
+    if not session_id or merged.get("query_summary"):
+        return merged
+
+    sentence = None if "analysis" in payload else merged.get("situation_sentence")
+    if not sentence and merged.get("analysis"):
+        sentence = await convert_analysis_to_sentence_async(
+            merged["analysis"],
+            use_cache=merged.get("use_cache", True),
+            mode=merged.get("sentence_mode")
+        )
+        await run_in_threadpool(_save_to_session, merged, situation_sentence=sentence)
+    merged["query_summary"] = sentence
+    return merged
+
+
+def _save_to_session(payload: dict, **changes):
+    if not payload.get("session_id"):
+        return
+    try:
+        session_store.update(payload["session_id"], **changes)
+    except SessionNotFound as e:
+        print(f"[세션 만료] {e}")
+
+
 @router.post("/similar")
-def recommend_similar_cases(payload: dict = Body(...)):
+async def recommend_similar_cases(payload: dict = Body(...)):
     """
     분석 결과를 문장으로 바꾸고, 유사 사고 사례 조회 (Pinecone 검색)
+    - session_id 만 보내면 세션의 analysis / 상황 문장 사용, 찾은 사례는 세션에 저장
     """
+    try:
+        payload = await _load_payload(payload)
+    except Exception as e:
+        return {"error": str(e)}
+
     analysis = payload.get("analysis")
     if not analysis:
         return {"error": "analysis 필드가 필요합니다."}
 
     try:
-        situation_sentence = convert_analysis_to_sentence(analysis)
-        similar_cases = query_similar_cases(situation_sentence)
+        situation_sentence = payload.get("query_summary") or await convert_analysis_to_sentence_async(
+            analysis,
+            use_cache=payload.get("use_cache", True),
+            mode=payload.get("sentence_mode")
+        )
+        similar_cases = await query_similar_cases_async(situation_sentence)
+        await run_in_threadpool(_save_to_session, payload, similar_case=similar_cases[0])
         return {
             "query_summary": situation_sentence,
             "similar_case": similar_cases[0]
@@ -28,11 +75,17 @@ def recommend_similar_cases(payload: dict = Body(...)):
         return {"error": str(e)}
 
 @router.post("/summary-text")
-def generate_summary_text(payload: dict = Body(...)):
+async def generate_summary_text(payload: dict = Body(...)):
     """
     사고 요약 + 유사 사례 기반 설명 문장 생성 (GPT)
     - 간결한 설명 문장만 반환
+    - session_id 만 보내면 세션의 상황 문장 / 유사 사례 사용, 생성한 설명은 세션에 저장
     """
+    try:
+        payload = await _load_payload(payload)
+    except Exception as e:
+        return {"error": str(e)}
+
     query_summary = payload.get("query_summary")
     similar_case = payload.get("similar_case")
 
@@ -40,7 +93,8 @@ def generate_summary_text(payload: dict = Body(...)):
         return {"error": "query_summary와 similar_case 필드는 필수입니다."}
 
     try:
-        explanation = generate_fault_explanation_gpt(query_summary, similar_case)
+        explanation = await generate_fault_explanation_gpt_async(query_summary, similar_case, use_cache=payload.get("use_cache", True))
+        await run_in_threadpool(_save_to_session, payload, explanation=explanation)
         return {
             "summary_explanation": explanation
         }
@@ -48,12 +102,46 @@ def generate_summary_text(payload: dict = Body(...)):
         return {"error": str(e)}
 
 
+@router.post("/summary-text/stream")
+async def stream_summary_text(payload: dict = Body(...)):
+    """
+    /summary-text 스트리밍 버전 (SSE)
+    - delta: {"content": 토큰 조각} / done: {"summary_explanation", "usage", "cached"} / error: {"error"}
+    """
+    try:
+        payload = await _load_payload(payload)
+    except Exception as e:
+        return {"error": str(e)}
+
+    query_summary = payload.get("query_summary")
+    similar_case = payload.get("similar_case")
+
+    if not query_summary or not similar_case:
+        return {"error": "query_summary와 similar_case 필드는 필수입니다."}
+
+    async def events():
+        async for event, data in stream_fault_explanation_gpt(
+            query_summary, similar_case, use_cache=payload.get("use_cache", True)
+        ):
+            if event == "done":
+                data = {"summary_explanation": data["content"], "usage": data["usage"], "cached": data["cached"]}
+                await run_in_threadpool(_save_to_session, payload, explanation=data["summary_explanation"])
+            yield event, data
+
+    return sse_response(events())
+
+
 @router.post("/summary-gpt")
-def generate_gpt_style_response(payload: dict = Body(...)):
+async def generate_gpt_style_response(payload: dict = Body(...)):
     """
     사고 요약 + 유사 사례 기반 GPT 스타일 응답 생성
     - 사용자에게 바로 전달 가능한 자연스러운 설명 응답
     """
+    try:
+        payload = await _load_payload(payload)
+    except Exception as e:
+        return {"error": str(e)}
+
     query_summary = payload.get("query_summary")
     similar_case = payload.get("similar_case")
 
@@ -61,7 +149,7 @@ def generate_gpt_style_response(payload: dict = Body(...)):
         return {"error": "query_summary와 similar_case 필드는 필수입니다."}
 
     try:
-        reply = generate_fault_response_gpt(query_summary, similar_case)
+        reply = await generate_fault_response_gpt_async(query_summary, similar_case, use_cache=payload.get("use_cache", True))
         return {
             "gpt_reply": reply
         }
@@ -1,21 +1,24 @@
 from fastapi import APIRouter, UploadFile, File
 import os
-import uuid
+from app.utils.video_store import video_store
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploaded_videos"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 @router.post("/video")
 async def upload_video(video: UploadFile = File(...)):
-    filename = f"{uuid.uuid4().hex}_{video.filename}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
-
-    with open(filepath, "wb") as f:
-        f.write(await video.read())
+    """
+    영상 저장 후 video_id 반환 (/analyze 에 video_id 로 재사용 가능)
+    - 같은 내용의 영상은 한 번만 저장
+    - filename: 업로드한 원래 파일명, stored_filename: 저장된 파일명 ({sha256}{확장자})
+    """
+    original_filename = video.filename
+    saved = await video_store.save(video)
 
     return {
-        "filename": filename,
-        "video_path": filepath
+        "video_id": saved["video_id"],
+        "filename": original_filename,
+        "stored_filename": os.path.basename(saved["video_path"]),
+        "video_path": saved["video_path"],
+        "sha256": saved["video_id"],
+        "size": saved["size"]
     }
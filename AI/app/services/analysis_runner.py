@@ -0,0 +1,72 @@
+import importlib
+import os
+from .model_registry import model_registry, DEFAULT_MODEL_NAME
+
+# 사고 유형 → (모듈, 분석기 클래스)
+# 분석기는 OpenCV/norfair/torch 를 끌어오므로 API 프로세스에서는 import 하지 않고 워커에서 필요할 때 로딩
+ANALYZER_CLASSES = {
+    "차대차": ("vehicle_to_vehicle", "VehicleToVehicleAnalyzer"),
+    "차대보행자": ("vehicle_to_pedestrian", "VehicleToPedestrianAnalyzer"),
+}
+SUPPORTED_ACCIDENT_TYPES = list(ANALYZER_CLASSES)
+# 탐지 로직/임계값이 바뀌면 올려서 이전 분석 결과 캐시를 무효화
+ANALYZER_VERSION = "2"
+
+
+def analysis_version() -> str:
+    return f"{ANALYZER_VERSION}:{DEFAULT_MODEL_NAME}"
+
+
+def analyzer_class(accident_type: str):
+    """
+    사고 유형별 분석기 클래스 (지원하지 않는 유형이면 None)
+    """
+    path = ANALYZER_CLASSES.get(accident_type)
+    if path is None:
+        return None
+    module_name, class_name = path
+    return getattr(importlib.import_module(f".{module_name}", __package__), class_name)
+
+
+def init_worker():
+    """
+    분석 워커 프로세스 시작 시 YOLO 모델 로딩 + 워밍업
+    - YOLO_WARMUP_MODELS=yolov8n.pt,yolov8s.pt 처럼 여러 가중치 지정 가능
+    """
+    names = [name.strip() for name in os.getenv("YOLO_WARMUP_MODELS", "").split(",") if name.strip()]
+    model_registry.preload(names or None)
+
+
+def run_analysis(video_path: str, accident_type: str, road_type: str) -> dict:
+    """
+    워커 프로세스에서 실행되는 영상 분석 (CPU 연산 전용)
+    - 저장된 탐지 결과가 있으면 영상/모델 없이 분석
+    - 없거나 부족하면 영상으로 분석 후 탐지 결과 저장
+    """
+    from .detection_archive import DetectionArchive, ArchiveMiss, DETECTION_ARCHIVE_ENABLED
+
+    analyzer_cls = analyzer_class(accident_type)
+    if analyzer_cls is None:
+        raise ValueError("지원하지 않는 사고 유형입니다.")
+
+    archive_path = DetectionArchive.path_for(video_path, DEFAULT_MODEL_NAME, analyzer_cls)
+    if DETECTION_ARCHIVE_ENABLED:
+        archive = DetectionArchive.load(archive_path)
+        if archive is not None:
+            try:
+                print("[저장된 탐지 결과로 분석]")
+                return analyzer_cls(video_path, accident_type, road_type, archive=archive).analyze()
+            except ArchiveMiss as e:
+                print(f"[저장된 탐지 결과 부족 → 영상으로 다시 분석] {e}")
+
+    analyzer = analyzer_cls(video_path, accident_type, road_type)
+    try:
+        results = analyzer.analyze()
+        if DETECTION_ARCHIVE_ENABLED:
+            try:
+                DetectionArchive.save(analyzer, archive_path)
+            except Exception as e:
+                print(f"[탐지 결과 저장 실패] {e}")
+        return results
+    finally:
+        analyzer.frames.release()
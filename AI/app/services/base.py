@@ -1,48 +1,135 @@
 import cv2
-from ultralytics import YOLO
+import numpy as np
+from .frame_source import FrameSource
+from .detection_store import DetectionStore
+from .inference import BatchInferenceEngine
+from .model_registry import model_registry, DEFAULT_MODEL_NAME
+from .sampling import SamplingPlan
+from .trajectory import TrajectoryStore
+from .traffic_light import TrafficLightTimeline
+from .road_geometry import RoadGeometry, DEFAULT_STRIDE as ROAD_GEOMETRY_STRIDE
 
 class BaseAccidentAnalyzer:
-    def __init__(self, video_path: str):
+    # detect_* 메서드 이름 → SamplingRequirement (자식 클래스에서 정의)
+    SAMPLING_REQUIREMENTS = {}
+
+    def __init__(self, video_path: str, model_name: str = DEFAULT_MODEL_NAME, archive=None):
         self.video_path = video_path
-        self.frames = self.load_video_frames()
-        self.model = self.load_yolo_model()
+        self.model_name = model_name
+        self.archive = archive
+        self.sampling_plan = None
+        self._trajectories = None
+        self._traffic_lights = None
+        self._road_geometry = None
+        self._brightness = {}
+
+        if archive is None:
+            self.frames = self.load_video_frames()
+            self.model = self.load_yolo_model()
+            self.names = self.model.names
+            self.detections = DetectionStore(
+                BatchInferenceEngine(self.model, model_registry.lock_for(model_name)),
+                self.frames,
+            )
+        else:
+            # 저장된 탐지 결과로 분석 (영상 디코딩/YOLO 추론 없음)
+            self.frames = archive.frames
+            self.model = None
+            self.names = archive.names
+            self.detections = archive.detection_store()
+            self._trajectories = archive.trajectory_store()
+            self._traffic_lights = archive.traffic_light_timeline()
+            self._road_geometry = archive.road_geometry()
+            self._brightness = archive.brightness_map()
 
     def load_video_frames(self):
-        import cv2
-        cap = cv2.VideoCapture(self.video_path)
-        if not cap.isOpened():
-            raise FileNotFoundError(f"[영상 열기 실패: {self.video_path}]")
+        """
+        영상 전체를 메모리에 올리지 않고, 필요한 프레임만 디코딩하는 프레임 소스 반환
+        """
+        return FrameSource(self.video_path)
 
-        frames = []
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frames.append(frame)
-        cap.release()
+    def load_yolo_model(self):
+        """
+        YOLOv8 모델 가져오기 - 워커 단위 레지스트리에서 로딩/워밍업된 모델 재사용
+        """
+        return model_registry.get(self.model_name)
 
-        if not frames:
-            raise ValueError("[영상에서 프레임을 하나도 불러오지 못함]")
+    def plan_sampling(self, detector_names: list) -> SamplingPlan:
+        """
+        실행할 detect_* 들의 샘플링 요구사항을 합쳐 프레임 계획 수립 후,
+        추론이 필요한 프레임만 한 번에 배치 추론
+        """
+        requirements = {name: self.SAMPLING_REQUIREMENTS[name] for name in detector_names}
+        self.sampling_plan = SamplingPlan(requirements, len(self.frames), self.frames.fps)
+        class_ids = self.sampling_plan.class_ids(self.names)
+        if self.archive is not None:
+            self.archive.check_coverage(self.sampling_plan.inference_indices, class_ids)
+            return self.sampling_plan
+        self.detections.classes = class_ids
 
-        return frames
+        print(f"[샘플링 계획] 추론 {len(self.sampling_plan.inference_indices)}/{len(self.frames)} 프레임")
+        self.detections.prefetch(self.sampling_plan.inference_indices)
+        return self.sampling_plan
 
-    
-    def load_yolo_model(self):
+    def frame_indices(self, detector_name: str) -> range:
         """
-        YOLOv8 모델 불러오기 - 절대 경로 기반으로 지정
+        detect_* 메서드가 사용할 프레임 번호 (계획이 없으면 요구사항에서 직접 계산)
+        - 간격은 SAMPLING_REQUIREMENTS 에 선언한 stride 만 사용 (계획에서 추론하지 않은 프레임을 읽지 않도록)
         """
-        import os
-        base_dir = os.path.dirname(os.path.dirname(__file__))  # project_root/
-        model_path = os.path.join(base_dir, "yolov8n.pt")
-        print(f"[YOLO 모델 로딩 시도] {model_path}")
+        if self.sampling_plan is not None and detector_name in self.sampling_plan.requirements:
+            return self.sampling_plan.indices_for(detector_name)
+        return self.SAMPLING_REQUIREMENTS[detector_name].indices(len(self.frames), self.frames.fps)
 
-        try:
-            return YOLO(model_path)
-        except Exception as e:
-            import traceback
-            print("[YOLO 모델 로딩 실패]", str(e))
-            traceback.print_exc()
-            raise
+    @property
+    def trajectories(self) -> TrajectoryStore:
+        """
+        샘플링 계획의 추론 프레임 전체에 대해 Norfair 추적을 한 번만 수행한 궤적 테이블
+        """
+        if self._trajectories is None:
+            if self.sampling_plan is None:
+                self.plan_sampling(list(self.SAMPLING_REQUIREMENTS))
+            print("[차량/보행자 추적]")
+            self._trajectories = TrajectoryStore.build(
+                self.detections, self.sampling_plan.inference_indices, self.names
+            )
+        return self._trajectories
+
+    @property
+    def traffic_lights(self) -> TrafficLightTimeline:
+        """
+        샘플링 계획의 추론 프레임에서 탐지된 신호등 색 상태 타임라인 (영상당 한 번 계산)
+        """
+        if self._traffic_lights is None:
+            if self.sampling_plan is None:
+                self.plan_sampling(list(self.SAMPLING_REQUIREMENTS))
+            print("[신호등 상태 분류]")
+            self._traffic_lights = TrafficLightTimeline.build(
+                self.frames, self.detections, self.sampling_plan.inference_indices
+            )
+        return self._traffic_lights
+
+    @property
+    def road_geometry(self) -> RoadGeometry:
+        """
+        ROAD_GEOMETRY_STRIDE 간격 프레임의 차선/중앙선 선분 (영상당 한 번 계산)
+        """
+        if self._road_geometry is None:
+            print("[차선/중앙선 추정]")
+            self._road_geometry = RoadGeometry.build(
+                self.frames, range(0, len(self.frames), ROAD_GEOMETRY_STRIDE)
+            )
+        return self._road_geometry
+
+    def frame_brightness(self, frame_indices) -> np.ndarray:
+        """
+        프레임별 평균 밝기(gray) - 계산한 값은 보관해 재사용 (탐지 결과와 함께 저장)
+        """
+        frame_indices = list(frame_indices)
+        missing = [idx for idx in frame_indices if idx not in self._brightness]
+        for idx, frame in self.frames.iter_indices(missing):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            self._brightness[idx] = float(np.mean(gray))
+        return np.array([self._brightness[idx] for idx in frame_indices if idx in self._brightness], dtype=np.float32)
 
     def analyze(self):
         """
@@ -0,0 +1,335 @@
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+from .detection_store import DetectionStore, FrameDetections
+from .trajectory import TrajectoryStore, TRACK_DTYPE
+from .traffic_light import TrafficLightTimeline, TIMELINE_DTYPE
+from .road_geometry import RoadGeometry, LINE_DTYPE
+
+DETECTION_ARCHIVE_DIR = os.getenv("DETECTION_ARCHIVE_DIR") or "detections"
+DETECTION_ARCHIVE_ENABLED = (os.getenv("DETECTION_ARCHIVE") or "1") != "0"
+# 2: 추적 매칭 거리 변경으로 저장된 track_id 재계산
+# 3: 프레임별 탐지 클래스(inferred_classes) 저장 - 도로 유형별 분석 결과를 한 저장소에 병합
+ARCHIVE_FORMAT_VERSION = 3
+
+# 탐지 테이블은 궤적 테이블과 같은 형식 (추적되지 않은 탐지는 track_id = -1)
+DETECTION_DTYPE = TRACK_DTYPE
+BRIGHTNESS_DTYPE = np.dtype([
+    ("frame_idx", "<i4"),
+    ("brightness", "<f4"),
+])
+
+
+class ArchiveMiss(Exception):
+    """
+    저장된 탐지 결과에 없는 프레임/클래스/픽셀이 필요한 경우 (영상+모델로 다시 분석해야 함)
+    """
+    pass
+
+
+class ArchivedFrames:
+    """
+    FrameSource 대용 - 길이/fps/해상도만 제공하고 픽셀 접근 시 ArchiveMiss
+    """
+
+    def __init__(self, length: int, fps: float, shape):
+        self._length = length
+        self.fps = fps
+        self.shape = tuple(shape)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, idx: int):
+        raise ArchiveMiss(f"프레임 {idx} 픽셀 정보가 저장되어 있지 않음")
+
+    def __iter__(self):
+        raise ArchiveMiss("프레임 픽셀 정보가 저장되어 있지 않음")
+
+    def iter_indices(self, indices):
+        indices = list(indices)
+        if indices:
+            raise ArchiveMiss(f"프레임 {indices[0]} 픽셀 정보가 저장되어 있지 않음")
+        return iter(())
+
+    def release(self):
+        pass
+
+
+class ArchivedInference:
+    """
+    BatchInferenceEngine 대용 - 저장되지 않은 프레임 추론 요청 시 ArchiveMiss
+    """
+
+    def run(self, frame_source, indices, classes=None):
+        indices = list(indices)
+        if indices:
+            raise ArchiveMiss(f"프레임 {indices[0]} 탐지 결과가 저장되어 있지 않음")
+        return iter(())
+
+
+class DetectionArchive:
+    """
+    영상 단위 탐지 결과 저장소 (영상 파일 옆 detections/ 디렉터리)
+    - detections.npy: (frame_idx, track_id, cls, conf, bbox) 구조화 배열, mmap 으로 로딩
+    - inferred_frames.npy: 추론한 프레임 번호 (탐지가 없는 프레임 포함)
+    - inferred_classes.npy: (프레임, 클래스 id) bool - 각 프레임에서 탐지한 클래스
+    - traffic_lights.npy / road_lines.npy / brightness.npy: 계산된 경우에만 저장
+    - meta.json: 프레임 수, fps, 해상도, 클래스 이름, 클래스 필터 (전체 프레임 합집합)
+    - 재분석(road_type 변경, 임계값 조정) 시 영상 디코딩/YOLO 추론 없이 detect_* 실행
+    - 저장 시 기존 결과와 병합하므로 도로 유형별로 다시 분석한 프레임/클래스가 누적됨
+    """
+
+    def __init__(self, path: str, meta: dict, arrays: dict):
+        self.path = path
+        self.meta = meta
+        self.names = {int(cls_id): label for cls_id, label in meta["names"].items()}
+        self.classes = meta["classes"]
+        self.detections = arrays["detections"]
+        self.inferred_frames = arrays["inferred_frames"]
+        self.inferred_classes = arrays["inferred_classes"]
+        self.traffic_lights = arrays.get("traffic_lights")
+        self.road_lines = arrays.get("road_lines")
+        self.road_frames = arrays.get("road_frames")
+        self.brightness = arrays.get("brightness")
+        self.frames = ArchivedFrames(meta["frame_count"], meta["fps"], meta["shape"])
+
+    @staticmethod
+    def path_for(video_path: str, model_name: str, analyzer_cls, root: str = DETECTION_ARCHIVE_DIR) -> str:
+        # 사고 유형(analyzer)마다 탐지 클래스가 달라 따로 저장
+        video_key = os.path.splitext(os.path.basename(video_path))[0]
+        model_key = os.path.splitext(os.path.basename(model_name))[0]
+        return os.path.join(root, f"{video_key}.{model_key}.{analyzer_cls.__name__}")
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        저장된 탐지 결과 로딩 (없거나 형식이 다르면 None)
+        """
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != ARCHIVE_FORMAT_VERSION:
+            return None
+
+        arrays = {}
+        for name in meta["arrays"]:
+            arrays[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        return cls(path, meta, arrays)
+
+    @classmethod
+    def save(cls, analyzer, path: str):
+        """
+        분석이 끝난 analyzer 의 탐지/추적/신호등/차선/밝기 결과 저장
+        - 같은 영상/모델의 기존 결과가 있으면 병합 후 교체
+        """
+        if analyzer.sampling_plan is None:
+            return None
+
+        names = {int(cls_id): label for cls_id, label in analyzer.names.items()}
+        inferred_frames = np.array(sorted(idx for idx, _ in analyzer.detections.items()), dtype=np.int32)
+        classes = analyzer.detections.classes
+        class_mask = np.zeros(max(names) + 1, dtype=bool)
+        class_mask[list(names) if classes is None else list(classes)] = True
+
+        arrays = {
+            "detections": tracked_rows(analyzer.detections, analyzer.trajectories),
+            "inferred_frames": inferred_frames,
+            "inferred_classes": np.tile(class_mask, (len(inferred_frames), 1)),
+        }
+        if analyzer._traffic_lights is not None:
+            arrays["traffic_lights"] = analyzer._traffic_lights.table
+        if analyzer._road_geometry is not None:
+            arrays["road_lines"] = analyzer._road_geometry.table
+            arrays["road_frames"] = np.array(analyzer._road_geometry.frame_indices, dtype=np.int32)
+        if analyzer._brightness:
+            arrays["brightness"] = np.array(sorted(analyzer._brightness.items()), dtype=BRIGHTNESS_DTYPE)
+
+        meta = {
+            "format_version": ARCHIVE_FORMAT_VERSION,
+            "model_name": analyzer.model_name,
+            "frame_count": len(analyzer.frames),
+            "fps": float(analyzer.frames.fps),
+            "shape": list(analyzer.frames.shape),
+            "names": {str(cls_id): label for cls_id, label in names.items()},
+            "classes": None if classes is None else [int(cls_id) for cls_id in classes],
+        }
+
+        existing = cls.load(path)
+        if existing is not None and existing.compatible_with(meta):
+            arrays = existing.merge(arrays)
+            covered = arrays["inferred_classes"].all(axis=0)
+            meta["classes"] = None if covered[list(names)].all() else np.flatnonzero(covered).tolist()
+        meta["arrays"] = list(arrays)
+
+        # 임시 디렉터리에 모두 쓴 뒤 교체 (읽는 쪽이 반쯤 쓰인 파일을 보지 않도록)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_path)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+            with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.rename(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        print(f"[탐지 결과 저장] {path} ({len(arrays['detections'])}개 탐지, {len(arrays['inferred_frames'])}개 프레임)")
+        return path
+
+    def compatible_with(self, meta: dict) -> bool:
+        """
+        같은 영상/모델로 만든 결과인지 (아니면 병합하지 않고 교체)
+        """
+        keys = ("model_name", "frame_count", "shape", "names")
+        return all(self.meta.get(key) == meta[key] for key in keys)
+
+    def merge(self, arrays: dict) -> dict:
+        """
+        새 분석 결과(arrays)에 기존 결과를 합친 배열 반환
+        - 새로 추론한 프레임의 새 클래스는 새 결과, 나머지 프레임/클래스는 기존 결과 유지
+        - 추적 ID 는 두 결과에서 따로 매겨졌으므로 합친 프레임 전체로 다시 추적
+        - 신호등/차선/밝기는 프레임 단위로 합침 (새로 계산한 프레임은 새 결과)
+        """
+        new_frames = arrays["inferred_frames"]
+        new_classes = arrays["inferred_classes"]
+
+        frames = np.union1d(self.inferred_frames, new_frames).astype(np.int32)
+        inferred_classes = np.zeros((len(frames), new_classes.shape[1]), dtype=bool)
+        inferred_classes[np.searchsorted(frames, self.inferred_frames)] = self.inferred_classes
+        new_pos = np.searchsorted(frames, new_frames)
+        inferred_classes[new_pos] |= new_classes
+
+        # 새 결과가 다시 탐지한 (프레임, 클래스) 의 기존 행은 버림
+        old = np.asarray(self.detections)
+        redetected = np.zeros_like(inferred_classes)
+        redetected[new_pos] = new_classes
+        old_pos = np.searchsorted(frames, old["frame_idx"])
+        kept = old[~redetected[old_pos, old["cls"]]]
+        detections = np.concatenate([kept, arrays["detections"]])
+        detections = detections[np.argsort(detections["frame_idx"], kind="stable")]
+        detections["track_id"] = -1
+
+        merged = {
+            "detections": detections,
+            "inferred_frames": frames,
+            "inferred_classes": inferred_classes,
+        }
+        store = DetectionArchive(self.path, self.meta, merged).detection_store()
+        merged["detections"] = tracked_rows(store, TrajectoryStore.build(store, frames.tolist(), self.names))
+
+        traffic_lights = merge_by_frame(self.traffic_lights, arrays.get("traffic_lights"), new_frames)
+        if traffic_lights is not None:
+            merged["traffic_lights"] = traffic_lights
+        road_lines = merge_by_frame(self.road_lines, arrays.get("road_lines"), arrays.get("road_frames"))
+        if road_lines is not None:
+            merged["road_lines"] = road_lines
+            merged["road_frames"] = np.union1d(
+                np.asarray([] if self.road_frames is None else self.road_frames, dtype=np.int32),
+                arrays.get("road_frames", np.empty(0, dtype=np.int32)),
+            ).astype(np.int32)
+        brightness = arrays.get("brightness")
+        brightness = merge_by_frame(
+            self.brightness, brightness, None if brightness is None else brightness["frame_idx"]
+        )
+        if brightness is not None:
+            merged["brightness"] = brightness
+        return merged
+
+    def check_coverage(self, frame_indices, class_ids):
+        """
+        샘플링 계획의 프레임/클래스가 저장된 결과에 모두 포함되는지 확인 (아니면 ArchiveMiss)
+        """
+        frame_indices = np.asarray(list(frame_indices), dtype=np.int32)
+        missing = np.setdiff1d(frame_indices, self.inferred_frames)
+        if len(missing):
+            raise ArchiveMiss(f"프레임 {int(missing[0])} 탐지 결과가 저장되어 있지 않음")
+
+        covered = np.asarray(self.inferred_classes)[np.searchsorted(self.inferred_frames, frame_indices)]
+        if class_ids is None:
+            class_ids = list(self.names)
+        if any(cls_id >= covered.shape[1] for cls_id in class_ids) or not covered[:, class_ids].all():
+            raise ArchiveMiss("필요한 클래스 탐지 결과가 저장되어 있지 않음")
+
+    def detection_store(self) -> DetectionStore:
+        store = DetectionStore(ArchivedInference(), self.frames)
+        store.classes = self.classes
+
+        table = self.detections
+        keys = table["frame_idx"]
+        for idx in self.inferred_frames.tolist():
+            start, end = np.searchsorted(keys, [idx, idx + 1])
+            rows = table[start:end]
+            store.add(idx, FrameDetections(
+                np.asarray(rows["bbox"], dtype=np.int32),
+                np.asarray(rows["cls"], dtype=np.int32),
+                np.asarray(rows["conf"], dtype=np.float32),
+                self.names,
+            ))
+        return store
+
+    def trajectory_store(self) -> TrajectoryStore:
+        table = self.detections
+        return TrajectoryStore(np.asarray(table[table["track_id"] >= 0]), self.names)
+
+    def traffic_light_timeline(self):
+        if self.traffic_lights is None:
+            return None
+        return TrafficLightTimeline(np.asarray(self.traffic_lights, dtype=TIMELINE_DTYPE))
+
+    def road_geometry(self):
+        if self.road_lines is None:
+            return None
+        return RoadGeometry(
+            np.asarray(self.road_lines, dtype=LINE_DTYPE), self.road_frames.tolist(), self.frames.shape
+        )
+
+    def brightness_map(self) -> dict:
+        if self.brightness is None:
+            return {}
+        return dict(zip(self.brightness["frame_idx"].tolist(), self.brightness["brightness"].tolist()))
+
+
+def tracked_rows(detections, trajectories) -> np.ndarray:
+    """
+    탐지 결과 전체를 DETECTION_DTYPE 배열로 (같은 프레임의 같은 박스로 추적 ID 연결, 없으면 -1)
+    """
+    rows = []
+    for idx, frame_detections in detections.items():
+        tracked = trajectories.rows_at(idx)
+        for k in range(len(frame_detections)):
+            match = tracked[
+                (tracked["cls"] == frame_detections.classes[k])
+                & np.all(tracked["bbox"] == frame_detections.boxes[k], axis=1)
+            ]
+            track_id = int(match["track_id"][0]) if len(match) else -1
+            rows.append((
+                idx,
+                track_id,
+                frame_detections.classes[k],
+                frame_detections.confs[k],
+                frame_detections.boxes[k],
+            ))
+    return np.array(rows, dtype=DETECTION_DTYPE)
+
+
+def merge_by_frame(old, new, new_frames):
+    """
+    프레임 번호가 있는 두 구조화 배열 병합 (new_frames 에 속한 기존 행은 새 결과로 대체)
+    """
+    if old is None:
+        return new
+    old = np.asarray(old)
+    if new is None:
+        return old
+    merged = np.concatenate([old[~np.isin(old["frame_idx"], new_frames)], new])
+    return merged[np.argsort(merged["frame_idx"], kind="stable")]
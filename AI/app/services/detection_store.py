@@ -0,0 +1,96 @@
+import numpy as np
+
+
+class FrameDetections:
+    """
+    한 프레임의 YOLO 결과(박스/클래스/신뢰도)를 NumPy 배열로 보관
+    - boxes: (N, 4) int32 xyxy
+    - classes: (N,) int32
+    - confs: (N,) float32
+    """
+    __slots__ = ("boxes", "classes", "confs", "labels")
+
+    def __init__(self, boxes, classes, confs, names):
+        self.boxes = boxes
+        self.classes = classes
+        self.confs = confs
+        self.labels = [names[int(c)] for c in classes]
+
+    @classmethod
+    def from_result(cls, result, names):
+        boxes = result.boxes
+        if len(boxes) == 0:
+            return cls(
+                np.empty((0, 4), dtype=np.int32),
+                np.empty(0, dtype=np.int32),
+                np.empty(0, dtype=np.float32),
+                names,
+            )
+        return cls(
+            boxes.xyxy.cpu().numpy().astype(np.int32),
+            boxes.cls.cpu().numpy().astype(np.int32),
+            boxes.conf.cpu().numpy().astype(np.float32),
+            names,
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def items(self):
+        """
+        (label, (x1, y1, x2, y2)) 를 YOLO 출력 순서대로 반환
+        """
+        for label, box in zip(self.labels, self.boxes):
+            yield label, tuple(int(v) for v in box)
+
+    def boxes_of(self, labels):
+        """
+        지정한 label 에 해당하는 박스만 반환
+        """
+        for label, box in self.items():
+            if label in labels:
+                yield box
+
+
+class DetectionStore:
+    """
+    영상 단위 탐지 결과 캐시
+    - 프레임마다 YOLO 추론은 한 번만 수행
+    - 모든 detect_* 메서드가 같은 결과를 공유
+    - prefetch() 로 필요한 프레임을 미리 배치 추론
+    """
+
+    def __init__(self, engine, frames):
+        self.engine = engine
+        self.frames = frames
+        self.classes = None  # 샘플링 계획에서 정한 클래스 id 필터
+        self._detections = {}
+
+    def get(self, frame_idx):
+        if frame_idx not in self._detections:
+            self.prefetch([frame_idx])
+        return self._detections[frame_idx]
+
+    def prefetch(self, frame_indices):
+        """
+        아직 추론하지 않은 프레임만 골라 배치 추론 후 저장
+        """
+        missing = [idx for idx in frame_indices if idx not in self._detections]
+        for idx, detections in self.engine.run(self.frames, missing, self.classes):
+            self._detections[idx] = detections
+
+    def add(self, frame_idx, detections: FrameDetections):
+        self._detections[frame_idx] = detections
+
+    def items(self):
+        """
+        (프레임 번호, FrameDetections) 를 프레임 순서대로 반환
+        """
+        for frame_idx in sorted(self._detections):
+            yield frame_idx, self._detections[frame_idx]
+
+    def __contains__(self, frame_idx):
+        return frame_idx in self._detections
+
+    def __len__(self):
+        return len(self._detections)
@@ -0,0 +1,95 @@
+"""
+궤적 특징 계산 커널 (NumPy 벡터 연산)
+- centers: (N, 2) 프레임 순서 중심 좌표
+- 반환 배열의 i 번째 값은 i → i+1 구간에 해당
+"""
+import numpy as np
+
+
+def step_vectors(centers: np.ndarray) -> np.ndarray:
+    """
+    프레임 간 이동 벡터 (dx, dy) - (N-1, 2)
+    """
+    return np.diff(np.asarray(centers, dtype=np.float64), axis=0).reshape(-1, 2)
+
+
+def step_distances(centers: np.ndarray) -> np.ndarray:
+    """
+    프레임 간 이동 거리 (속도 근사) - (N-1,)
+    """
+    steps = step_vectors(centers)
+    return np.hypot(steps[:, 0], steps[:, 1])
+
+
+def mean_speed(centers: np.ndarray) -> float:
+    speeds = step_distances(centers)
+    return float(speeds.mean()) if len(speeds) else 0.0
+
+
+def headings(centers: np.ndarray, skip_stationary: bool = False) -> np.ndarray:
+    """
+    이동 방향 각도(degree, -180 ~ 180) - skip_stationary 면 이동 없는 구간 제외
+    """
+    steps = step_vectors(centers)
+    if skip_stationary:
+        steps = steps[np.any(steps != 0, axis=1)]
+    return np.degrees(np.arctan2(steps[:, 1], steps[:, 0]))
+
+
+def heading_changes(centers: np.ndarray) -> np.ndarray:
+    """
+    연속 구간 사이 방향 변화량 |Δθ| - (N-2,)
+    """
+    return np.abs(np.diff(headings(centers)))
+
+
+def lateral_shifts(centers: np.ndarray) -> np.ndarray:
+    """
+    프레임 간 수평 이동량 |dx| - (N-1,)
+    """
+    return np.abs(step_vectors(centers)[:, 0])
+
+
+def distances_to(center, others: np.ndarray) -> np.ndarray:
+    """
+    한 점과 여러 점 사이 거리 - (M,)
+    """
+    others = np.asarray(others, dtype=np.float64).reshape(-1, 2)
+    return np.hypot(others[:, 0] - center[0], others[:, 1] - center[1])
+
+
+def paired_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    같은 위치끼리 짝지은 두 점 배열 사이 거리 - (N,)
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 2)
+    return np.hypot(a[:, 0] - b[:, 0], a[:, 1] - b[:, 1])
+
+
+def pairwise_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    두 점 집합 사이 거리 행렬 - (N, M)
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 2)
+    diff = a[:, None, :] - b[None, :, :]
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+
+def min_pairwise_distance(centers: np.ndarray) -> float:
+    """
+    한 프레임 안 차량들 중 가장 가까운 두 차량 거리 (2대 미만이면 inf)
+    """
+    if len(centers) < 2:
+        return float("inf")
+    dist = pairwise_distances(centers, centers)
+    return float(dist[np.triu_indices(len(centers), k=1)].min())
+
+
+def line_angles(lines: np.ndarray) -> np.ndarray:
+    """
+    HoughLinesP 결과 (K, 1, 4) → 선분 각도(degree)
+    """
+    lines = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+    return np.degrees(np.arctan2(lines[:, 3] - lines[:, 1], lines[:, 2] - lines[:, 0]))
@@ -0,0 +1,124 @@
+import os
+from collections import OrderedDict
+import cv2
+
+DEFAULT_CACHE_SIZE = int(os.getenv("FRAME_CACHE_SIZE") or 32)
+# 이 간격 이하로 앞쪽 프레임을 요청하면 seek 대신 grab 으로 건너뜀
+SEEK_GRAB_LIMIT = 30
+
+
+class FrameSource:
+    """
+    영상 프레임을 필요할 때만 디코딩하는 프레임 소스
+    - for frame in source: 순차 스트리밍 (여러 번 반복 가능)
+    - source[idx]: seek 기반 임의 접근
+    - 최근 디코딩한 프레임은 LRU 캐시에 cache_size 개까지만 보관
+    """
+
+    def __init__(self, video_path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.video_path = video_path
+        self.cache_size = max(1, cache_size)
+        self._cache = OrderedDict()
+
+        self._cap = cv2.VideoCapture(video_path)
+        if not self._cap.isOpened():
+            raise FileNotFoundError(f"[영상 열기 실패: {video_path}]")
+
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._pos = 0  # 다음 read() 가 반환할 프레임 번호
+        self._length = self._probe_length()
+
+        if self._length == 0:
+            self.release()
+            raise ValueError("[영상에서 프레임을 하나도 불러오지 못함]")
+
+        self.shape = self[0].shape
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        idx = 0
+        while idx < self._length:
+            try:
+                yield self[idx]
+            except IndexError:
+                return
+            idx += 1
+
+    def __getitem__(self, idx: int):
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError(f"frame index out of range: {idx}")
+
+        frame = self._cache.get(idx)
+        if frame is not None:
+            self._cache.move_to_end(idx)
+            return frame
+
+        self._seek(idx)
+        ret, frame = self._cap.read()
+        if not ret:
+            # 컨테이너 메타데이터보다 실제 프레임이 적은 경우
+            self._length = idx
+            raise IndexError(f"frame index out of range: {idx}")
+        self._pos = idx + 1
+
+        self._cache[idx] = frame
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return frame
+
+    def iter_indices(self, indices):
+        """
+        지정한 프레임만 순서대로 디코딩 (건너뛸 프레임은 grab 만 수행)
+        """
+        for idx in sorted(set(indices)):
+            try:
+                yield idx, self[idx]
+            except IndexError:
+                return
+
+    def release(self):
+        if getattr(self, "_cap", None) is not None:
+            self._cap.release()
+            self._cap = None
+        self._cache.clear()
+
+    def __del__(self):
+        self.release()
+
+    def _seek(self, idx: int):
+        if idx == self._pos:
+            return
+        if self._pos < idx <= self._pos + SEEK_GRAB_LIMIT:
+            while self._pos < idx:
+                self._cap.grab()
+                self._pos += 1
+            return
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        self._pos = idx
+
+    def _probe_length(self) -> int:
+        """
+        프레임 수 확인 - 메타데이터 값의 마지막 프레임이 실제로 읽히는지 검증,
+        실패하면 grab 으로 직접 센다
+        """
+        count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if count > 0:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, count - 1)
+            if self._cap.grab():
+                self._rewind()
+                return count
+
+        self._rewind()
+        count = 0
+        while self._cap.grab():
+            count += 1
+        self._rewind()
+        return count
+
+    def _rewind(self):
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._pos = 0
@@ -0,0 +1,52 @@
+import os
+import threading
+from .detection_store import FrameDetections
+
+DEFAULT_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE") or 8)
+
+
+def configure_cpu_threads(num_threads: int = None) -> int:
+    """
+    PyTorch intra-op 스레드 수 설정 (기본: 전체 CPU 코어)
+    """
+    import torch
+
+    num_threads = num_threads or int(os.getenv("YOLO_NUM_THREADS") or 0) or os.cpu_count() or 1
+    if torch.get_num_threads() != num_threads:
+        torch.set_num_threads(num_threads)
+    return num_threads
+
+
+class BatchInferenceEngine:
+    """
+    필요한 프레임들을 batch_size 단위로 묶어 YOLO 추론
+    - 프레임 번호별 FrameDetections 를 순서대로 반환
+    - classes: 남길 클래스 id 목록 (None 이면 전체)
+    """
+
+    def __init__(self, model, model_lock=None, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.model = model
+        self.model_lock = model_lock or threading.Lock()
+        self.batch_size = max(1, batch_size)
+
+    def run(self, frame_source, indices, classes=None):
+        batch_indices = []
+        batch_frames = []
+
+        for idx, frame in frame_source.iter_indices(indices):
+            batch_indices.append(idx)
+            batch_frames.append(frame)
+
+            if len(batch_frames) == self.batch_size:
+                yield from self._predict(batch_indices, batch_frames, classes)
+                batch_indices, batch_frames = [], []
+
+        if batch_frames:
+            yield from self._predict(batch_indices, batch_frames, classes)
+
+    def _predict(self, indices, frames, classes=None):
+        with self.model_lock:
+            results = self.model.predict(frames, verbose=False, classes=classes)
+
+        for idx, result in zip(indices, results):
+            yield idx, FrameDetections.from_result(result, self.model.names)
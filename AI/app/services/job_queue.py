@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .analysis_runner import init_worker
+
+MAX_WORKERS = int(os.getenv("ANALYSIS_WORKERS") or 2)
+MAX_PENDING = int(os.getenv("ANALYSIS_QUEUE_SIZE") or 8)
+MAX_FINISHED_JOBS = int(os.getenv("ANALYSIS_JOB_HISTORY") or 256)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class AnalysisJobQueue:
+    """
+    영상 분석 작업 큐
+    - 분석은 워커 프로세스 풀에서 실행되어 이벤트 루프를 막지 않음
+    - 동시에 실행되는 작업은 max_workers 개, 대기 작업은 max_pending 개까지만 허용
+    - 작업 상태: queued → running → done / failed
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self.max_finished = max_finished
+        self._executor = None
+        self._semaphore = None
+        self._warmup_futures = []
+        self._jobs = OrderedDict()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # torch 스레드가 떠 있는 프로세스를 fork 하지 않도록 spawn 사용
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return self._executor
+
+    def start(self):
+        """
+        서버 시작 시 워커 프로세스를 미리 띄워 모델 로딩/워밍업 (기다리지 않고 바로 반환)
+        """
+        self._warmup_futures = [self.executor.submit(time.sleep, 0) for _ in range(self.max_workers)]
+
+    async def warm_up(self):
+        """
+        워커가 모델 로딩을 마치고 작업을 받을 수 있을 때까지 대기 (로딩 실패 시 예외)
+        """
+        if not self._warmup_futures:
+            self.start()
+        try:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in self._warmup_futures))
+        except Exception:
+            # 워커 초기화 실패로 풀이 깨지면 정리해서 다음 시도 때 새로 띄움
+            self.shutdown()
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._warmup_futures = []
+
+    def _discard_executor(self, executor):
+        """
+        워커가 비정상 종료되어 깨진 풀 정리 (다른 작업이 이미 새 풀로 바꿨으면 그대로 둠)
+        """
+        if self._executor is executor:
+            print("[분석 워커 비정상 종료 → 워커 풀 재시작]")
+            self.shutdown()
+
+    def active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(self, fn, *args, on_result=None) -> str:
+        """
+        작업 등록 후 job_id 즉시 반환 (큐가 가득 차면 QueueFullError)
+        - on_result: 워커 결과를 받아 최종 결과로 바꾸는 async 함수 (선택)
+        """
+        if self.active_count() >= self.max_workers + self.max_pending:
+            raise QueueFullError("분석 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        self._jobs[job_id] = job
+        job["task"] = asyncio.get_running_loop().create_task(self._run(job, fn, args, on_result))
+        return job_id
+
+    def complete(self, result) -> str:
+        """
+        이미 결과가 있는 작업(캐시 적중 등)을 완료 상태로 바로 등록
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "status": "done",
+            "result": result,
+            "error": None,
+            "created_at": now,
+            "finished_at": now,
+        }
+        self._trim()
+        return job_id
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        return {key: value for key, value in job.items() if key not in ("task", "waiters")}
+
+    def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return self._public(job)
+
+    async def wait(self, job_id: str):
+        """
+        작업이 끝날 때까지 대기 - 기다리는 동안은 완료 작업 정리(_trim) 대상에서 제외
+        """
+        job = self._jobs[job_id]
+        job["waiters"] = job.get("waiters", 0) + 1
+        try:
+            if "task" in job:
+                await asyncio.shield(job["task"])
+        finally:
+            job["waiters"] -= 1
+        return self._public(job)
+
+    async def _run(self, job, fn, args, on_result):
+        try:
+            async with self._semaphore:
+                job["status"] = "running"
+                loop = asyncio.get_running_loop()
+                executor = self.executor
+                try:
+                    result = await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    # 워커 하나가 죽으면 풀 전체가 깨지므로 새 풀로 바꾸고 한 번 다시 시도
+                    self._discard_executor(executor)
+                    result = await loop.run_in_executor(self.executor, fn, *args)
+
+            if on_result is not None:
+                result = await on_result(result)
+
+            job["result"] = result
+            job["status"] = "done"
+        except Exception as e:
+            print(f"[분석 작업 실패] {job['job_id']}: {e}")
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            self._trim()
+
+    def _trim(self):
+        """
+        완료 작업이 max_finished 를 넘으면 가장 먼저 끝난 작업부터 삭제 (결과를 기다리는 작업은 제외)
+        """
+        finished = [job for job in self._jobs.values() if job["finished_at"] is not None]
+        excess = len(finished) - self.max_finished
+        if excess <= 0:
+            return
+        evictable = sorted((job for job in finished if not job.get("waiters")), key=lambda job: job["finished_at"])
+        for job in evictable[:excess]:
+            del self._jobs[job["job_id"]]
+
+
+job_queue = AnalysisJobQueue()
@@ -0,0 +1,82 @@
+import os
+import threading
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # project_root/
+DEFAULT_MODEL_NAME = os.getenv("YOLO_MODEL") or "yolov8n.pt"
+
+
+class ModelRegistry:
+    """
+    프로세스(워커) 단위 YOLO 모델 저장소
+    - 가중치 파일별로 한 번만 로딩하고 더미 프레임으로 워밍업
+    - 로딩은 전역 락, 추론은 모델별 락으로 동시 요청에서도 안전하게 사용
+    """
+
+    def __init__(self, base_dir: str = BASE_DIR, warmup_size: int = 640):
+        self.base_dir = base_dir
+        self.warmup_size = warmup_size
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def resolve_path(self, name: str) -> str:
+        if os.path.isabs(name):
+            return name
+        return os.path.join(self.base_dir, name)
+
+    def get(self, name: str = DEFAULT_MODEL_NAME):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                model = self._load(name)
+                self._warmup(model)
+                self._locks[name] = threading.Lock()
+                self._models[name] = model
+        return self._models[name]
+
+    def lock_for(self, name: str = DEFAULT_MODEL_NAME):
+        self.get(name)
+        return self._locks[name]
+
+    def preload(self, names=None):
+        """
+        서버 시작 시 모델 로딩 + 워밍업
+        """
+        for name in names or [DEFAULT_MODEL_NAME]:
+            self.get(name)
+
+    def loaded(self) -> list:
+        return list(self._models)
+
+    def _load(self, name: str):
+        # ultralytics/torch 는 모델을 실제로 로딩하는 워커 프로세스에서만 import (API 프로세스 기동 시간 단축)
+        from ultralytics import YOLO
+        from .inference import configure_cpu_threads
+
+        configure_cpu_threads()
+        model_path = self.resolve_path(name)
+        print(f"[YOLO 모델 로딩 시도] {model_path}")
+
+        try:
+            return YOLO(model_path)
+        except Exception as e:
+            import traceback
+            print("[YOLO 모델 로딩 실패]", str(e))
+            traceback.print_exc()
+            raise
+
+    def _warmup(self, model):
+        print("[YOLO 모델 워밍업]")
+        dummy = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+        model.predict(dummy, verbose=False)
+
+
+model_registry = ModelRegistry()
+
+
+def get_model(name: str = None):
+    return model_registry.get(name or DEFAULT_MODEL_NAME)
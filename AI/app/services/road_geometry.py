@@ -0,0 +1,92 @@
+import os
+import cv2
+import numpy as np
+from .features import line_angles
+
+DEFAULT_STRIDE = int(os.getenv("ROAD_GEOMETRY_STRIDE") or 10)
+DEFAULT_SCALE = float(os.getenv("ROAD_GEOMETRY_SCALE") or 0.5)
+DEFAULT_ROI_TOP = float(os.getenv("ROAD_GEOMETRY_ROI_TOP") or 0.5)  # 화면 아래쪽(도로 영역)만 사용
+MIN_LINE_LENGTH = 100  # 원본 해상도 기준
+
+LINE_DTYPE = np.dtype([
+    ("frame_idx", "<i4"),
+    ("line", "<f4", (4,)),
+    ("angle", "<f4"),
+    ("length", "<f4"),
+])
+
+
+class RoadGeometry:
+    """
+    영상 단위 차선/중앙선 추정 결과
+    - 샘플링 프레임마다 축소 + ROI 영상에서 Canny + HoughLinesP 한 번 수행
+    - 검출된 선분은 원본 해상도 좌표로 보관하고 detect_* 들이 조회
+    """
+
+    def __init__(self, table: np.ndarray, frame_indices, frame_shape):
+        self.table = np.sort(table, order="frame_idx")
+        self.frame_indices = list(frame_indices)
+        self.height = frame_shape[0]
+        self._frame_keys = self.table["frame_idx"]
+
+    @classmethod
+    def build(cls, frames, frame_indices, scale: float = DEFAULT_SCALE, roi_top: float = DEFAULT_ROI_TOP):
+        roi_y = int(frames.shape[0] * roi_top)
+        rows = []
+        sampled = []
+
+        for idx, frame in frames.iter_indices(frame_indices):
+            sampled.append(idx)
+            small = cv2.resize(frame[roi_y:], None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            edges = cv2.Canny(gray, 50, 150)
+
+            lines = cv2.HoughLinesP(
+                edges, 1, np.pi / 180,
+                threshold=max(1, int(100 * scale)),
+                minLineLength=int(MIN_LINE_LENGTH * scale),
+                maxLineGap=max(1, int(10 * scale)),
+            )
+            if lines is None:
+                continue
+
+            # 원본 해상도 좌표로 복원
+            lines = lines.reshape(-1, 4).astype(np.float32) / scale
+            lines[:, [1, 3]] += roi_y
+            angles = line_angles(lines)
+            lengths = np.hypot(lines[:, 2] - lines[:, 0], lines[:, 3] - lines[:, 1])
+            for line, angle, length in zip(lines, angles, lengths):
+                rows.append((idx, line, angle, length))
+
+        return cls(np.array(rows, dtype=LINE_DTYPE), sampled, frames.shape)
+
+    def lines_at(self, frame_idx: int) -> np.ndarray:
+        start, end = np.searchsorted(self._frame_keys, [frame_idx, frame_idx + 1])
+        return self.table[start:end]
+
+    def center_line_y(self, frame_idx: int, angle_threshold: float = 20, min_length: float = 200):
+        """
+        화면 아래쪽 절반의 거의 수평인 긴 선분 평균 y (없으면 None)
+        """
+        rows = self.lines_at(frame_idx)
+        rows = rows[(np.abs(rows["angle"]) < angle_threshold) & (rows["length"] >= min_length)]
+        y_mean = (rows["line"][:, 1] + rows["line"][:, 3]) // 2
+        y_mean = y_mean[y_mean > self.height // 2]
+        if not len(y_mean):
+            return None
+        return int(y_mean.mean())
+
+    def center_line_series(self, angle_threshold: float = 20, min_length: float = 200):
+        """
+        시간에 따른 중앙선 y - (프레임 번호 배열, y 배열)
+        """
+        series = [(idx, self.center_line_y(idx, angle_threshold, min_length)) for idx in self.frame_indices]
+        series = [(idx, y) for idx, y in series if y is not None]
+        return np.array([idx for idx, _ in series], dtype=np.int32), np.array([y for _, y in series], dtype=np.int32)
+
+    def lane_angles(self, max_abs_angle: float = 45, min_length: float = MIN_LINE_LENGTH) -> np.ndarray:
+        """
+        전체 샘플 프레임의 차선 각도 (수평에 가까운 선분만)
+        """
+        mask = (np.abs(self.table["angle"]) < max_abs_angle) & (self.table["length"] >= min_length)
+        return self.table["angle"][mask]
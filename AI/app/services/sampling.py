@@ -0,0 +1,75 @@
+class SamplingRequirement:
+    """
+    detect_* 메서드가 필요로 하는 프레임 샘플링 조건
+    - stride / offset: range(offset, frame_count, stride)
+    - window: (시작 초, 끝 초) 구간만 사용, None 이면 영상 전체
+    - classes: 필요한 YOLO 클래스 이름, None 이면 전체 클래스
+    - inference: False 면 YOLO 추론 없이 프레임 디코딩만 필요
+    """
+
+    def __init__(self, stride: int = 1, offset: int = 0, window: tuple = None, classes: list = None, inference: bool = True):
+        self.stride = max(1, stride)
+        self.offset = offset
+        self.window = window
+        self.classes = classes
+        self.inference = inference
+
+    def indices(self, frame_count: int, fps: float) -> range:
+        start, end = 0, frame_count
+        if self.window is not None:
+            start_sec, end_sec = self.window
+            if start_sec is not None:
+                start = max(0, int(start_sec * fps))
+            if end_sec is not None:
+                end = min(frame_count, int(end_sec * fps) + 1)
+
+        # offset 기준 stride 격자에 맞춰 시작 프레임 보정
+        first = self.offset
+        if start > first:
+            first += -(-(start - first) // self.stride) * self.stride
+        return range(first, end, self.stride)
+
+
+class SamplingPlan:
+    """
+    도로 유형별 detect_* 요구사항을 합친 영상 단위 프레임 계획
+    - inference_indices: YOLO 추론이 필요한 프레임 (합집합, 정렬)
+    - decode_indices: 디코딩이 필요한 모든 프레임
+    - classes: 추론 시 남길 클래스 이름 집합 (None 이면 전체)
+    """
+
+    def __init__(self, requirements: dict, frame_count: int, fps: float):
+        self.requirements = requirements
+        self.frame_count = frame_count
+        self.fps = fps
+
+        inference_indices = set()
+        decode_indices = set()
+        classes = set()
+        for requirement in requirements.values():
+            indices = requirement.indices(frame_count, fps)
+            decode_indices.update(indices)
+            if requirement.inference:
+                inference_indices.update(indices)
+            elif requirement.classes is None:
+                continue
+            if classes is not None:
+                if requirement.classes is None:
+                    classes = None
+                else:
+                    classes.update(requirement.classes)
+
+        self.inference_indices = sorted(inference_indices)
+        self.decode_indices = sorted(decode_indices)
+        self.classes = classes
+
+    def indices_for(self, name: str) -> range:
+        return self.requirements[name].indices(self.frame_count, self.fps)
+
+    def class_ids(self, names: dict):
+        """
+        YOLO model.names 기준 클래스 id 목록 (모델에 없는 이름은 무시)
+        """
+        if self.classes is None:
+            return None
+        return sorted(cls_id for cls_id, label in names.items() if label in self.classes)
@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+
+STATES = ["red", "yellow", "green", "unknown"]
+RED, YELLOW, GREEN, UNKNOWN = range(len(STATES))
+
+# HSV 색 범위 (OpenCV Hue 0~180)
+COLOR_RANGES = {
+    RED: [((0, 70, 50), (10, 255, 255)), ((160, 70, 50), (180, 255, 255))],
+    YELLOW: [((15, 70, 50), (35, 255, 255))],
+    GREEN: [((40, 70, 50), (90, 255, 255))],
+}
+# 기존 판별식 np.sum(mask) / mask.size > 0.2 (mask 값 255) 와 같은 기준
+COLOR_RATIO_THRESHOLD = 0.2
+CROP_SIZE = (16, 32)  # (w, h) - 배치 처리를 위해 신호등 영역을 같은 크기로 맞춤
+DEFAULT_BATCH_SIZE = 256
+
+TIMELINE_DTYPE = np.dtype([
+    ("frame_idx", "<i4"),
+    ("bbox", "<i4", (4,)),
+    ("state", "i1"),
+    ("red_ratio", "<f4"),
+])
+
+
+def cut_crop(frame: np.ndarray, box) -> np.ndarray:
+    """
+    신호등 영역을 잘라 CROP_SIZE 로 줄인 사본 (원본 프레임을 참조하지 않으므로 프레임은 바로 해제됨)
+    - 영역이 비어 있으면 빈 배열
+    """
+    x1, y1, x2, y2 = box
+    crop = frame[max(0, y1):y2, max(0, x1):x2]
+    if crop.size == 0:
+        return np.empty((0, 0, 3), dtype=frame.dtype)
+    return cv2.resize(crop, CROP_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def classify_crops(crops: list):
+    """
+    신호등 영역들을 한 번에 HSV 변환 후 red/yellow/green/unknown 분류
+    - 반환: (상태 배열, red_ratio 배열)
+    """
+    states = np.full(len(crops), UNKNOWN, dtype=np.int8)
+    red_ratios = np.zeros(len(crops), dtype=np.float32)
+
+    valid = [k for k, crop in enumerate(crops) if crop.size > 0]
+    if not valid:
+        return states, red_ratios
+
+    w, h = CROP_SIZE
+    # 세로로 이어 붙여 cvtColor 한 번으로 변환
+    mosaic = np.concatenate([
+        crops[k] if crops[k].shape[:2] == (h, w) else cv2.resize(crops[k], (w, h), interpolation=cv2.INTER_AREA)
+        for k in valid
+    ], axis=0)
+    hsv = cv2.cvtColor(mosaic, cv2.COLOR_BGR2HSV).reshape(len(valid), h, w, 3)
+
+    ratios = {}
+    for state, ranges in COLOR_RANGES.items():
+        mask = np.zeros(hsv.shape[:3], dtype=bool)
+        for lower, upper in ranges:
+            mask |= np.all((hsv >= lower) & (hsv <= upper), axis=-1)
+        ratios[state] = mask.mean(axis=(1, 2)) * 255
+
+    valid_states = np.full(len(valid), UNKNOWN, dtype=np.int8)
+    # 빨간불 우선 판정 (기존 신호위반 로직과 동일), 나머지는 노란불 → 초록불 순
+    for state in (GREEN, YELLOW, RED):
+        valid_states[ratios[state] > COLOR_RATIO_THRESHOLD] = state
+
+    states[valid] = valid_states
+    red_ratios[valid] = ratios[RED]
+    return states, red_ratios
+
+
+class TrafficLightTimeline:
+    """
+    영상 단위 신호등 상태 타임라인
+    - 탐지된 신호등 영역을 배치로 한 번만 색 분류
+    - 프레임/신호등별 상태를 모든 신호 관련 detect_* 가 조회
+    """
+
+    def __init__(self, table: np.ndarray):
+        self.table = np.sort(table, order="frame_idx")
+        self._frame_keys = self.table["frame_idx"]
+
+    @classmethod
+    def build(cls, frames, detections, frame_indices, batch_size: int = DEFAULT_BATCH_SIZE):
+        light_frames = [idx for idx in frame_indices if "traffic light" in detections.get(idx).labels]
+
+        rows = []
+        crops = []
+        pending = []
+
+        def flush():
+            states, red_ratios = classify_crops(crops)
+            for (idx, bbox), state, red_ratio in zip(pending, states, red_ratios):
+                rows.append((idx, bbox, state, red_ratio))
+            crops.clear()
+            pending.clear()
+
+        for idx, frame in frames.iter_indices(light_frames):
+            for x1, y1, x2, y2 in detections.get(idx).boxes_of(["traffic light"]):
+                # 신호등 영역 자르기 (16x32 사본으로 바로 줄여 배치가 프레임 전체를 붙잡지 않도록)
+                crops.append(cut_crop(frame, (x1, y1, x2, y2)))
+                pending.append((idx, (x1, y1, x2, y2)))
+            if len(crops) >= batch_size:
+                flush()
+        if crops:
+            flush()
+
+        return cls(np.array(rows, dtype=TIMELINE_DTYPE))
+
+    def __len__(self):
+        return len(self.table)
+
+    def has_lights(self, frame_indices=None) -> bool:
+        if frame_indices is None:
+            return len(self.table) > 0
+        return bool(np.isin(self._frame_keys, np.fromiter(frame_indices, dtype=np.int32)).any())
+
+    def rows_at(self, frame_idx: int) -> np.ndarray:
+        start, end = np.searchsorted(self._frame_keys, [frame_idx, frame_idx + 1])
+        return self.table[start:end]
+
+    def states_at(self, frame_idx: int) -> list:
+        return [STATES[state] for state in self.rows_at(frame_idx)["state"]]
+
+    def is_state(self, frame_idx: int, state: str) -> bool:
+        return state in self.states_at(frame_idx)
+
+    def is_red(self, frame_idx: int) -> bool:
+        return self.is_state(frame_idx, "red")
+
+    def frames_with(self, state: str) -> np.ndarray:
+        return np.unique(self._frame_keys[self.table["state"] == STATES.index(state)])
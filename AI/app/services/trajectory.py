@@ -0,0 +1,179 @@
+import numpy as np
+from norfair import Detection, Tracker
+
+VEHICLE_LABELS = ["car", "truck", "bus"]
+TRACKED_LABELS = VEHICLE_LABELS + ["person"]
+# 차종 오분류(car ↔ truck)로 ID 가 끊기지 않도록 같은 그룹끼리만 매칭
+TRACK_GROUPS = {"car": "vehicle", "truck": "vehicle", "bus": "vehicle", "person": "person"}
+MIN_TRACK_LENGTH = 3
+# 추적 매칭 거리 (px) - 프레임 1칸당 이동 허용치 × 샘플 간격, 단 급차선 변경/급정지 같은 한 번의 급이동
+# (detect_abrupt_maneuvering 50px, detect_illegal_lane_change 50px 등) 도 같은 ID 로 이어지도록 MAX_JUMP_DISTANCE 이상
+TRACK_DISTANCE_PER_FRAME = 30
+MAX_JUMP_DISTANCE = 120
+
+# 영상 단위 탐지/추적 테이블 한 행
+TRACK_DTYPE = np.dtype([
+    ("frame_idx", "<i4"),
+    ("track_id", "<i4"),
+    ("cls", "<i2"),
+    ("conf", "<f4"),
+    ("bbox", "<i4", (4,)),
+])
+
+
+class Track:
+    """
+    차량/보행자 한 개체의 궤적 (프레임 순서 NumPy 배열)
+    - frames: (N,) 프레임 번호
+    - centers: (N, 2) bbox 중심 (cx, cy)
+    - bboxes: (N, 4) xyxy
+    - classes: (N,) YOLO 클래스 id
+    """
+    __slots__ = ("track_id", "frames", "centers", "bboxes", "classes", "label")
+
+    def __init__(self, track_id, frames, bboxes, classes, label):
+        self.track_id = track_id
+        self.frames = frames
+        self.bboxes = bboxes
+        self.centers = (bboxes[:, :2] + bboxes[:, 2:]) // 2
+        self.classes = classes
+        self.label = label
+
+    def __len__(self):
+        return len(self.frames)
+
+    def mean_y(self) -> float:
+        return float(self.centers[:, 1].mean())
+
+    def select(self, frame_indices) -> "Track":
+        """
+        지정한 프레임에 해당하는 구간만 잘라낸 궤적
+        """
+        mask = np.isin(self.frames, np.fromiter(frame_indices, dtype=np.int32))
+        return Track(self.track_id, self.frames[mask], self.bboxes[mask], self.classes[mask], self.label)
+
+
+def tracking_distance_threshold(frame_indices) -> float:
+    """
+    샘플 간격(연속한 추론 프레임 간 최대 간격)에 비례한 매칭 거리, 최소 MAX_JUMP_DISTANCE
+    """
+    gaps = np.diff(np.asarray(frame_indices, dtype=np.int64))
+    stride = int(gaps.max()) if len(gaps) else 1
+    return float(max(TRACK_DISTANCE_PER_FRAME * stride, MAX_JUMP_DISTANCE))
+
+
+class TrajectoryStore:
+    """
+    영상 단위 궤적 테이블 (Norfair 추적 1회 결과)
+    - track_id → Track
+    - 프레임 번호 → 해당 프레임의 행 (다른 차량/보행자 위치 조회용)
+    """
+
+    def __init__(self, table: np.ndarray, names: dict):
+        self.names = names
+        self.table = np.sort(table, order=["track_id", "frame_idx"])
+
+        self.tracks = {}
+        if len(self.table):
+            track_ids, starts = np.unique(self.table["track_id"], return_index=True)
+            ends = list(starts[1:]) + [len(self.table)]
+            for track_id, start, end in zip(track_ids, starts, ends):
+                rows = self.table[start:end]
+                classes = rows["cls"].astype(np.int32)
+                label = names[int(np.bincount(classes).argmax())]
+                self.tracks[int(track_id)] = Track(int(track_id), rows["frame_idx"], rows["bbox"], classes, label)
+
+        self._by_frame = self.table[np.argsort(self.table["frame_idx"], kind="stable")]
+        self._frame_keys = self._by_frame["frame_idx"]
+
+    @classmethod
+    def build(cls, detections, frame_indices, names: dict, labels=TRACKED_LABELS, distance_threshold=None):
+        """
+        샘플링된 프레임 순서대로 Norfair 추적을 한 번 수행해 궤적 테이블 생성
+        - distance_threshold 를 주지 않으면 샘플 간격에 맞춰 계산 (tracking_distance_threshold)
+        """
+        frame_indices = list(frame_indices)
+        if distance_threshold is None:
+            distance_threshold = tracking_distance_threshold(frame_indices)
+
+        tracker = Tracker(
+            distance_function="euclidean",
+            distance_threshold=distance_threshold,
+            initialization_delay=0,
+        )
+        rows = []
+
+        for frame_idx in frame_indices:
+            frame_detections = detections.get(frame_idx)
+            norfair_detections = []
+            for k, label in enumerate(frame_detections.labels):
+                if label not in labels:
+                    continue
+                x1, y1, x2, y2 = frame_detections.boxes[k]
+                center = np.array([[(x1 + x2) // 2, (y1 + y2) // 2]])
+                norfair_detections.append(Detection(points=center, label=TRACK_GROUPS.get(label, label), data=(frame_idx, k)))
+
+            for obj in tracker.update(detections=norfair_detections):
+                detected_frame, k = obj.last_detection.data
+                if detected_frame != frame_idx:
+                    continue  # 이번 프레임에서 매칭되지 않은 추정 위치는 제외
+                rows.append((
+                    frame_idx,
+                    obj.id,
+                    frame_detections.classes[k],
+                    frame_detections.confs[k],
+                    frame_detections.boxes[k],
+                ))
+
+        return cls(np.array(rows, dtype=TRACK_DTYPE), names)
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __iter__(self):
+        return iter(self.tracks.values())
+
+    def tracks_of(self, labels, min_length: int = 1) -> list:
+        return [track for track in self.tracks.values() if track.label in labels and len(track) >= min_length]
+
+    def ego_track(self, labels=VEHICLE_LABELS):
+        """
+        본 차량 궤적 추정 - 평균 y 가 가장 큰(화면 하단) 차량
+        """
+        candidates = self.tracks_of(labels, MIN_TRACK_LENGTH) or self.tracks_of(labels)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda track: track.mean_y())
+
+    def _filter_labels(self, rows: np.ndarray, labels) -> np.ndarray:
+        if labels is not None and len(rows):
+            class_ids = [cls_id for cls_id, label in self.names.items() if label in labels]
+            rows = rows[np.isin(rows["cls"], class_ids)]
+        return rows
+
+    def rows_at(self, frame_idx: int, labels=None) -> np.ndarray:
+        start, end = np.searchsorted(self._frame_keys, [frame_idx, frame_idx + 1])
+        return self._filter_labels(self._by_frame[start:end], labels)
+
+    def rows_in(self, frame_indices, labels=None) -> np.ndarray:
+        """
+        여러 프레임의 행 (프레임 순, 같은 프레임 안에서는 track_id 순)
+        """
+        mask = np.isin(self._frame_keys, np.fromiter(frame_indices, dtype=np.int32))
+        return self._filter_labels(self._by_frame[mask], labels)
+
+    def centers_at(self, frame_idx: int, labels=None):
+        """
+        해당 프레임의 (track_id 배열, (N, 2) 중심 배열)
+        """
+        rows = self.rows_at(frame_idx, labels)
+        bboxes = rows["bbox"]
+        return rows["track_id"], (bboxes[:, :2] + bboxes[:, 2:]) // 2
+
+    def centers_in(self, frame_indices, labels=None):
+        """
+        여러 프레임의 (frame_idx 배열, track_id 배열, (N, 2) 중심 배열) - rows_in 과 같은 순서
+        """
+        rows = self.rows_in(frame_indices, labels)
+        bboxes = rows["bbox"]
+        return rows["frame_idx"], rows["track_id"], (bboxes[:, :2] + bboxes[:, 2:]) // 2
@@ -1,23 +1,37 @@
 from .base import BaseAccidentAnalyzer
-import cv2
+from .sampling import SamplingRequirement
+from . import features
 import numpy as np
-from norfair import Detection, Tracker
 import os
-from math import hypot
 
 class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
-    def __init__(self, video_path: str, accident_type: str, road_context: str):
-        super().__init__(video_path)
+    SAMPLING_REQUIREMENTS = {
+        "detect_pedestrian_signal_violation": SamplingRequirement(stride=1, classes=["traffic light", "person"]),
+        "detect_crosswalk_violation": SamplingRequirement(stride=1, classes=["traffic light", "crosswalk", "person"]),
+        "detect_pedestrian_protection_duty": SamplingRequirement(stride=3, offset=1, classes=["car", "truck", "bus", "person"]),
+        "detect_vehicle_slow_duty": SamplingRequirement(stride=3, offset=1, classes=["car", "truck", "bus"]),
+        "detect_low_visibility_condition": SamplingRequirement(stride=5, inference=False),
+        "detect_school_zone_condition": SamplingRequirement(stride=1, classes=["school zone", "children zone"]),
+    }
+
+    def __init__(self, video_path: str, accident_type: str, road_context: str, archive=None):
+        super().__init__(video_path, archive=archive)
         self.accident_type = accident_type  # e.g., "차대보행자"
         self.road_context = road_context    # e.g., "보도 없음", "보도 있음", "고속도로", "보호구역"
-        self.tracker = Tracker(
-            distance_function="euclidean",
-            distance_threshold=30
-        )
 
     def analyze(self):
         results = {}
 
+        detector_names = [
+            "detect_pedestrian_signal_violation", "detect_crosswalk_violation",
+            "detect_pedestrian_protection_duty", "detect_vehicle_slow_duty",
+        ]
+        if self.road_context in ["야간", "시야장애"]:
+            detector_names.append("detect_low_visibility_condition")
+        if self.road_context == "보호구역":
+            detector_names.append("detect_school_zone_condition")
+        self.plan_sampling(detector_names)
+
         results["보행자 신호 위반"] = self.detect_pedestrian_signal_violation()
         results["무단횡단 여부"] = self.detect_crosswalk_violation()
         results["보호 의무 위반"] = self.detect_pedestrian_protection_duty()
@@ -40,7 +54,7 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
     def detect_pedestrian_signal_violation(self):
         """
         교차로에서 보행자 신호 위반 판단:
-            - 신호등 색상 분석 (적색인지)
+            - 신호등 색상 분석 (신호등 상태 타임라인에서 적색인지)
             - 보행자 진입 시점 분석
         """
         print("[보행자 신호위반 판단]")
@@ -49,49 +63,25 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
         pedestrian_entered = False
         red_light_frame_idx = None
         enter_frame_index = None
+        frame_height = self.frames.shape[0]
 
-        for idx, frame in enumerate(self.frames):
-            results = self.model.predict(frame, verbose=False)[0]
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                label = self.model.names[cls]
-
-                if label == "traffic light":
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    light_region = frame[y1:y2, x1:x2]
-                    hsv = cv2.cvtColor(light_region, cv2.COLOR_BGR2HSV)
-
-                    lower_red1 = np.array([0, 70, 50])
-                    upper_red1 = np.array([10, 255, 255])
-                    lower_red2 = np.array([160, 70, 50])
-                    upper_red2 = np.array([180, 255, 255])
-
-                    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-                    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-                    red_mask = mask1 | mask2
-
-                    red_ratio = np.sum(red_mask) / red_mask.size
-                    if red_ratio > 0.2:
-                        red_light_detected = True
-                        red_light_frame_idx = idx
-                
-                for box in results.boxes:
-                    cls = int(box.cls[0])
-                    if self.model.names[cls] == "person":
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        if y2 > frame.shape[0] * 0.8:
-                            pedestrian_entered = True
-                            enter_frame_index = idx
-
-                
-                if red_light_detected and pedestrian_entered:
-                    break
+        for idx in self.frame_indices("detect_pedestrian_signal_violation"):
+            if self.traffic_lights.is_red(idx):
+                red_light_detected = True
+                red_light_frame_idx = idx
+
+            for x1, y1, x2, y2 in self.trajectories.rows_at(idx, ["person"])["bbox"]:
+                if y2 > frame_height * 0.8:
+                    pedestrian_entered = True
+                    enter_frame_index = idx
 
-            if red_light_detected and pedestrian_entered and enter_frame_index >= red_light_frame_idx:
-                return True
-            else:
-                return False
+            if red_light_detected and pedestrian_entered:
+                break
+
+        if red_light_detected and pedestrian_entered and enter_frame_index >= red_light_frame_idx:
+            return True
+        else:
+            return False
 
     def detect_crosswalk_violation(self):
         """
@@ -106,46 +96,19 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
         red_light_detected = False
         red_light_frame_idx = None
         violation_detected = False
-        pedestrian_signal_detected = False
-
-        for idx, frame in enumerate(self.frames):
-            results = self.model.predict(frame, verbose=False)[0]
-
-            current_crosswalks = []
-            pedestrians = []
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                label = self.model.names[cls]
-
-                if label == "traffic light":
-                    pedestrian_signal_detected = True
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    light_region = frame[y1:y2, x1:x2]
-                    hsv = cv2.cvtColor(light_region, cv2.COLOR_BGR2HSV)
-
-                    lower_red1 = np.array([0, 70, 50])
-                    upper_red1 = np.array([10, 255, 255])
-                    lower_red2 = np.array([160, 70, 50])
-                    upper_red2 = np.array([180, 255, 255])
-
-                    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-                    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-                    red_mask = mask1 | mask2
-
-                    red_ratio = np.sum(red_mask) / red_mask.size
-                    if red_ratio > 0.2:
-                        red_light_detected = True
-                        red_light_frame_index = idx
-                
-                elif label == "crosswalk":
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    current_crosswalks.append((x1, y1, x2, y2))
-
-                elif label == "person":
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    pedestrians.append((cx, cy))
+
+        indices = self.frame_indices("detect_crosswalk_violation")
+        pedestrian_signal_detected = self.traffic_lights.has_lights(indices)
+        frame_height = self.frames.shape[0]
+
+        for idx in indices:
+            if self.traffic_lights.is_red(idx) and not red_light_detected:
+                red_light_detected = True
+                red_light_frame_idx = idx
+
+            current_crosswalks = list(self.detections.get(idx).boxes_of(["crosswalk"]))
+            _, centers = self.trajectories.centers_at(idx, ["person"])
+            pedestrians = centers.tolist()
 
             if current_crosswalks:
                 crosswalk_bboxes = current_crosswalks
@@ -157,7 +120,7 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
                         inside_crosswalk = True
                         break
 
-                if not inside_crosswalk and cy > frame.shape[0] * 0.6:
+                if not inside_crosswalk and cy > frame_height * 0.6:
                     violation_detected = True
                     break
 
@@ -176,61 +139,35 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
     def detect_pedestrian_protection_duty(self, proximity_threshold=100, speed_threshold=10):
         """
         보행자 보호 의무 위반 판단:
-            - 차량이 보행자 근처에서 감속/정지하지 않았으면 위반
+            - 본 차량이 보행자 근처에서 감속/정지하지 않았으면 위반
         """
 
         print("[보호 의무 위반 판단]")
 
-        prev_vehicle_center = None
-        vehicle_speed_sum = 0
-        speed_count = 0
-        protection_violation = False
-
-        for i in range(1, len(self.frames), 3):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            vehicle_center = None
-            pedestrians = []
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                label = self.model.names[cls]
-
-                if label in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    vehicle_center = (cx, cy)
-
-                elif label == "person":
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    pedestrians.append((cx, cy))
-
-            if not vehicle_center or not pedestrians:
-                continue
-
-            if prev_vehicle_center:
-                dx = vehicle_center[0] - prev_vehicle_center[0]
-                dy = vehicle_center[1] - prev_vehicle_center[1]
-                dist = hypot(dx, dy)
-                vehicle_speed_sum += dist
-                speed_count += 1
-
-            prev_vehicle_center = vehicle_center
-
-            for (px, py) in pedestrians:
-                dist_to_pedestrian = hypot(vehicle_center[0] - px, vehicle_center[1] - py)
-                if dist_to_pedestrian < proximity_threshold:
-                    avg_speed = vehicle_speed_sum / speed_count if speed_count else 0
-                    if avg_speed > speed_threshold:
-                        protection_violation = True
-                    break
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return False
+        ego = ego.select(self.frame_indices("detect_pedestrian_protection_duty"))
 
-            if protection_violation:
-                break
+        # 보행자가 있는 프레임만 사용, 프레임별 최근접 보행자 거리
+        keep = []
+        nearest = []
+        for i, vehicle_center in zip(ego.frames.tolist(), ego.centers):
+            _, pedestrians = self.trajectories.centers_at(i, ["person"])
+            keep.append(len(pedestrians) > 0)
+            nearest.append(features.distances_to(vehicle_center, pedestrians).min() if len(pedestrians) else np.inf)
+
+        keep = np.array(keep, dtype=bool)
+        if not keep.any():
+            return False
+        nearest = np.array(nearest)[keep]
 
-        return protection_violation
+        # 각 시점까지의 누적 평균 속도 (첫 프레임은 0)
+        speeds = features.step_distances(ego.centers[keep])
+        avg_speed = np.zeros(len(nearest))
+        avg_speed[1:] = np.cumsum(speeds) / np.arange(1, len(speeds) + 1)
+
+        return bool(np.any((nearest < proximity_threshold) & (avg_speed > speed_threshold)))
 
     def detect_vehicle_slow_duty(self, speed_threshold=10.0):
         """
@@ -246,29 +183,12 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
             return "서행 의무 없음"
 
         # [2] 속도 추정 로직
-        from math import hypot
-        prev_center = None
-        speed_sum = 0
-        count = 0
-
-        for i in range(1, len(self.frames), 3):
-            results = self.model.predict(self.frames[i], verbose=False)[0]
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                    if prev_center is not None:
-                        dist = hypot(cx - prev_center[0], cy - prev_center[1])
-                        speed_sum += dist
-                        count += 1
-
-                    prev_center = (cx, cy)
-                    break
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return False
 
-        avg_speed = speed_sum / count if count else 0
+        ego = ego.select(self.frame_indices("detect_vehicle_slow_duty"))
+        avg_speed = features.mean_speed(ego.centers)
         return avg_speed > speed_threshold
 
     def detect_low_visibility_condition(self, brightness_threshold=50):
@@ -278,17 +198,8 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
         """
         print("[야간/시야장애 판단]")
 
-        total_brightness = 0
-        frame_count = 0
-
-        for i in range(0, len(self.frames), 5):
-            frame = self.frames[i]
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            avg_brightness = np.mean(gray)
-            total_brightness += avg_brightness
-            frame_count += 1
-
-        avg_frame_brightness = total_brightness / frame_count if frame_count else 255
+        brightness = self.frame_brightness(self.frame_indices("detect_low_visibility_condition"))
+        avg_frame_brightness = float(brightness.mean()) if len(brightness) else 255
 
         return avg_frame_brightness < brightness_threshold
 
@@ -300,13 +211,10 @@ class VehicleToPedestrianAnalyzer(BaseAccidentAnalyzer):
         """
         print("[보호구역 여부 판단]")
 
-        for frame in self.frames:
-            results = self.model.predict(frame, verbose=False)[0]
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                label = self.model.names[cls]
-
+        indices = self.frame_indices("detect_school_zone_condition")
+        self.detections.prefetch(indices)
+        for idx in indices:
+            for label in self.detections.get(idx).labels:
                 if label in ["school zone", "children zone"]:
                     return True  # 보호구역 내 사고로 간주
 
@@ -1,27 +1,63 @@
 from .base import BaseAccidentAnalyzer
+from .sampling import SamplingRequirement
+from . import features
+from .road_geometry import DEFAULT_STRIDE as ROAD_GEOMETRY_STRIDE
 import cv2
 import numpy as np
-from norfair import Detection, Tracker
 import os
 
+VEHICLES = ["car", "truck", "bus"]
+
 class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
-    def __init__(self, video_path: str, accident_type: str, road_type: str):
-        super().__init__(video_path)
+    SAMPLING_REQUIREMENTS = {
+        "detect_signal_violation": SamplingRequirement(stride=1, classes=["traffic light"] + VEHICLES),
+        "detect_slow_driving_obligation": SamplingRequirement(stride=1, offset=1, classes=VEHICLES),
+        # 차선/중앙선 추정과 같은 프레임 사용
+        "detect_center_line_violation": SamplingRequirement(stride=ROAD_GEOMETRY_STRIDE, classes=VEHICLES),
+        "detect_prior_entry": SamplingRequirement(stride=1, classes=["car", "truck"]),
+        "detect_wrong_direction_driving": SamplingRequirement(stride=3, classes=VEHICLES),
+        "detect_tailgating": SamplingRequirement(stride=3, classes=VEHICLES),
+        "detect_turn_duty_violation": SamplingRequirement(stride=3, offset=1, classes=["car", "truck"]),
+        "detect_illegal_lane_change": SamplingRequirement(stride=3, offset=1, classes=["car", "truck"]),
+        "detect_merge_yield_violation": SamplingRequirement(stride=3, offset=1, classes=["car", "truck"]),
+        "detect_unclear_lane_entry": SamplingRequirement(stride=3, offset=1, classes=["car", "truck"]),
+        "detect_abrupt_maneuvering": SamplingRequirement(stride=3, offset=1, classes=["car", "truck"]),
+    }
+
+    # 도로 유형별 실행되는 detect_* (신호등 미탐지 시 서행 판단 fallback 포함)
+    ROAD_TYPE_DETECTORS = {
+        "교차로": [
+            "detect_signal_violation", "detect_slow_driving_obligation", "detect_prior_entry",
+            "detect_turn_duty_violation", "detect_wrong_direction_driving",
+            "detect_illegal_lane_change", "detect_abrupt_maneuvering",
+        ],
+        "고속도로": [
+            "detect_tailgating", "detect_wrong_direction_driving",
+            "detect_abrupt_maneuvering", "detect_illegal_lane_change",
+        ],
+        "일반도로": [
+            "detect_center_line_violation", "detect_tailgating", "detect_illegal_lane_change",
+            "detect_abrupt_maneuvering", "detect_wrong_direction_driving",
+        ],
+        "골목길": [
+            "detect_unclear_lane_entry", "detect_tailgating",
+            "detect_illegal_lane_change", "detect_abrupt_maneuvering",
+        ],
+    }
+    ROAD_TYPE_DETECTORS["대로"] = ROAD_TYPE_DETECTORS["소로"] = ROAD_TYPE_DETECTORS["일반도로"]
+    ROAD_TYPE_DETECTORS["주택가"] = ROAD_TYPE_DETECTORS["주차장"] = ROAD_TYPE_DETECTORS["골목길"]
+
+    def __init__(self, video_path: str, accident_type: str, road_type: str, archive=None):
+        super().__init__(video_path, archive=archive)
         self.accident_type = accident_type
         self.road_type = road_type
-        self.tracker = Tracker(
-            distance_function="euclidean",
-            distance_threshold=30
-        )
+        self._prior_entry_result = None
 
     def analyze(self):
         results = {}
 
-        cap = cv2.VideoCapture(self.video_path)
-        if not cap.isOpened():
-            print(f"[오류] 영상 열기 실패: {self.video_path}")
-            return {"error": "영상 열기 실패"}
-
+        if self.road_type in self.ROAD_TYPE_DETECTORS:
+            self.plan_sampling(self.ROAD_TYPE_DETECTORS[self.road_type])
 
         if self.road_type == "교차로":
             results["신호위반"] = self.detect_signal_violation()
@@ -68,7 +104,7 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         """
         교차로에서 신호위반 여부 판단
         - 신호등 존재 여부 확인
-        - 빨간불(Hue 기반 마스크) + 차량 진입 시점 비교
+        - 빨간불(신호등 상태 타임라인) + 차량 진입 시점 비교
         - 신호등 없으면 서행 판단 또는 질문 필요로 처리
         """
 
@@ -81,46 +117,22 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         car_entered = False
         enter_frame_index = None    
         red_light_frame_index = None
-        signal_detected = False
-
-        for idx, frame in enumerate(self.frames):
-            results = self.model.predict(frame, verbose=False)[0]
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                label = self.model.names[cls]
 
-                if label == "traffic light":
-                    signal_detected = True
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
+        indices = self.frame_indices("detect_signal_violation")
+        signal_detected = self.traffic_lights.has_lights(indices)
+        frame_height = self.frames.shape[0]
 
-                    # 신호등 영역 자르기
-                    light_region = frame[y1:y2, x1:x2]
-                    hsv = cv2.cvtColor(light_region, cv2.COLOR_BGR2HSV)
-
-                    # 빨간불 판별: HSV 마스크 처리
-                    lower_red1 = np.array([0, 70, 50])
-                    upper_red1 = np.array([10, 255, 255])
-                    lower_red2 = np.array([160, 70, 50])
-                    upper_red2 = np.array([180, 255, 255])
-
-                    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-                    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-                    red_mask = mask1 | mask2
-
-                    red_ratio = np.sum(red_mask) / red_mask.size
-                    if red_ratio > 0.2:  # 픽셀 비율 기준
-                        red_light_detected = True
-                        red_light_frame_index = idx
+        for idx in indices:
+            # 빨간불 판별: 신호등 상태 타임라인 조회
+            if self.traffic_lights.is_red(idx):
+                red_light_detected = True
+                red_light_frame_index = idx
 
             # 차량 진입 판단
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    if y2 > frame.shape[0] * 0.8:
-                        car_entered = True
-                        enter_frame_index = idx
+            for x1, y1, x2, y2 in self.trajectories.rows_at(idx, VEHICLES)["bbox"]:
+                if y2 > frame_height * 0.8:
+                    car_entered = True
+                    enter_frame_index = idx
 
             if red_light_detected and car_entered:
                 break
@@ -138,83 +150,39 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
     def detect_slow_driving_obligation(self, speed_threshold=10.0):
         """
         신호가 없는 구간에서 차량 속도가 일정 이상이면 '서행 불이행' 으로 판단
-        속도 추정 방식: 프레임 간 차량 위치 변화 거리 / 시간
+        속도 추정 방식: 프레임 간 본 차량 궤적 위치 변화 거리 / 시간
         """
 
         print("[서행 여부 판단]")
 
-        from math import hypot
-        prev_center = None
-        speed_sum = 0
-        count = 0
-
-        for i in range(1, len(self.frames)):
-            results = self.model.predict(self.frames[i], verbose=False)[0]
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                    if prev_center is not None:
-                        dist = hypot(cx - prev_center[0], cy - prev_center[1])
-                        speed_sum += dist
-                        count += 1
-                    
-                    prev_center = (cx, cy)
-                    break
-        
-        avg_speed = speed_sum / count if count else 0
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return False
+
+        ego = ego.select(self.frame_indices("detect_slow_driving_obligation"))
+        avg_speed = features.mean_speed(ego.centers)
         return avg_speed > speed_threshold
-    
+
     def detect_center_line_violation(self, angle_threshold=20):
         """
         중앙선 침범 여부 판단
-        - 수평선(HoughLinesP) 기준으로 중앙선 추정
+        - 수평선(HoughLinesP) 기준으로 중앙선 추정 (영상 단위 차선 추정 결과 사용)
         - 차량 중심 y좌표가 그 아래로 침범하면 True
         """
 
         print("[중앙선 침범 여부 판단]")
 
-        from math import atan2, degrees
-
-        for frame in self.frames:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-
-            lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=100, minLineLength=200, maxLineGap=10)
-            if lines is None:
-                continue
-
-            height = frame.shape[0]
-            center_line_y = height // 2
-            detected_center_lines = []
+        center_frames, center_ys = self.road_geometry.center_line_series(angle_threshold)
+        indices = set(self.frame_indices("detect_center_line_violation"))
 
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                angle = abs(degrees(atan2(y2 - y1, x2 - x1)))
-                if angle < angle_threshold:  # 거의 수평선
-                    y_mean = (y1 + y2) // 2
-                    if y_mean > center_line_y:
-                        detected_center_lines.append(y_mean)
-
-            if not detected_center_lines:
+        for idx, estimated_center_y in zip(center_frames.tolist(), center_ys.tolist()):
+            if idx not in indices:
                 continue
 
-            estimated_center_y = sum(detected_center_lines) // len(detected_center_lines)
-
             # 차량 위치 판단
-            results = self.model.predict(frame, verbose=False)[0]
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx = (x1 + x2) // 2
-                    cy = (y1 + y2) // 2
-
-                    if cy > estimated_center_y:
-                        return True  # 중심이 중앙선 아래 → 침범
+            _, centers = self.trajectories.centers_at(idx, VEHICLES)
+            if np.any(centers[:, 1] > estimated_center_y):
+                return True  # 중심이 중앙선 아래 → 침범
 
         return False  # 침범 아님 or 판단불가
 
@@ -224,43 +192,35 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         - 각 차량의 진입선(y 기준) 통과 프레임 추적
         - 평균 y값 기준으로 본 차량 추정
         - 진입 순서 비교하여 True/False 반환
+        - 회전 중 주의의무 판단에서도 재사용하므로 결과는 영상당 한 번만 계산
         """
         if self.road_type != "교차로":
             return "미적용: 교차로 외 도로에서는 선진입 판단 제외"
 
+        if self._prior_entry_result is None:
+            self._prior_entry_result = self._compute_prior_entry()
+        return self._prior_entry_result
+
+    def _compute_prior_entry(self):
         print("[선진입 여부 판단]")
 
-        entry_line_y = int(self.frames[0].shape[0] * 0.6)
-        tracker = Tracker(distance_function="euclidean", distance_threshold=30)
+        entry_line_y = int(self.frames.shape[0] * 0.6)
+        indices = self.frame_indices("detect_prior_entry")
         id_entry_frames = {}      # 차량 ID별 진입 프레임
         y_positions = {}          # 차량 ID별 y 좌표 궤적
 
-        for frame_idx, frame in enumerate(self.frames):
-            results = self.model.predict(frame, verbose=False)[0]
-
-            detections = []
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx = (x1 + x2) // 2
-                    cy = (y1 + y2) // 2
-                    detections.append(Detection(points=np.array([[cx, cy]])))
-
-            tracked_objects = tracker.update(detections=detections)
-
-            for obj in tracked_objects:
-                track_id = obj.id
-                cy = int(obj.estimate[0][1])
+        for track in self.trajectories.tracks_of(["car", "truck"]):
+            track = track.select(indices)
+            if not len(track):
+                continue
 
-                # 진입선 넘었으면 기록
-                if cy > entry_line_y and track_id not in id_entry_frames:
-                    id_entry_frames[track_id] = frame_idx
+            # y 좌표 누적
+            y_positions[track.track_id] = track.centers[:, 1]
 
-                # y 좌표 누적
-                if track_id not in y_positions:
-                    y_positions[track_id] = []
-                y_positions[track_id].append(cy)
+            # 진입선 넘었으면 기록
+            entered = np.nonzero(track.centers[:, 1] > entry_line_y)[0]
+            if len(entered):
+                id_entry_frames[track.track_id] = int(track.frames[entered[0]])
 
         if len(id_entry_frames) < 2 or len(y_positions) < 2:
             return "판단불가: 두 차량 궤적 또는 진입 정보 부족"
@@ -270,73 +230,40 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         first_id, _ = sorted_entries[0]
         second_id, _ = sorted_entries[1]
 
-        # 본 차량 = 평균 y가 더 큰 차량 (하단에서 진입한 차량)
-        avg_y = {tid: np.mean(y_list) for tid, y_list in y_positions.items()}
-        my_id = max(avg_y, key=avg_y.get)  # y가 가장 큰 차량이 내 차량
+        # 본 차량 = 진입 판단에 쓴 차량(car/truck, 같은 프레임) 중 평균 y가 가장 큰 차량 (하단에서 진입한 차량)
+        my_id = max(y_positions, key=lambda track_id: float(y_positions[track_id].mean()))
 
         return first_id == my_id  # 내가 먼저 진입했으면 True
         
+
     def detect_wrong_direction_driving(self, angle_diff_threshold=120):
         """
         차량 궤적과 차선 방향의 평균 angle 차이가 크면 역주행 판단
-            - 궤적: 프레임 간 중심점 이동 방향의 angle 평균
-            - 차선: houghLinesP 기반 도로 각도 평균균
+            - 궤적: 본 차량 궤적의 프레임 간 중심점 이동 방향 angle 평균
+            - 차선: 샘플 프레임 houghLinesP 기반 도로 각도 평균
         """
         
         print("[역주행 여부 판단]")
 
-        from math import atan2, degrees
-
-        prev_center = None
-        vehicle_angles = []
-
-        for i in range(0, len(self.frames), 3):  # 프레임 샘플링
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            # 차량 중심점 추출
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                    if prev_center:
-                        dx = cx - prev_center[0]
-                        dy = cy - prev_center[1]
-
-                        if dx == 0 and dy == 0:
-                            continue
-
-                        angle = degrees(atan2(dy, dx))
-                        vehicle_angles.append(angle)
-                    prev_center = (cx, cy)
-                    break
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return "판단 불가: 차량궤적 부족"
 
-        # 차량 진행 평균 방향
-        if not vehicle_angles:
+        # 차량 진행 평균 방향 (이동 없는 구간 제외)
+        ego = ego.select(self.frame_indices("detect_wrong_direction_driving"))  # 프레임 샘플링
+        vehicle_angles = features.headings(ego.centers, skip_stationary=True)
+        if not len(vehicle_angles):
             return "판단 불가: 차량궤적 부족"
         
-        avg_vehicle_angle = sum(vehicle_angles) / len(vehicle_angles)
-
-        # 차선 방향 검출
-        frame = self.frames[len(self.frames) // 2]
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        lines = cv2.HoughLinesP(edges, 1, np.pi / 180, 100, minLineLength=100, maxLineGap=10)
-
-        lane_angles = []
-        if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                angle = degrees(atan2(y2 - y1, x2 - x1))
-                if abs(angle) < 45:  # 수평에 가까운 차선만 고려
-                    lane_angles.append(angle)
-
-        if not lane_angles:
+        avg_vehicle_angle = float(vehicle_angles.mean())
+
+        # 차선 방향 (영상 단위 차선 추정 결과, 수평에 가까운 차선만 고려)
+        lane_angles = self.road_geometry.lane_angles(max_abs_angle=45)
+
+        if not len(lane_angles):
             return "판단불가: 차선 인식 실패"
 
-        avg_lane_angle = sum(lane_angles) / len(lane_angles)
+        avg_lane_angle = float(lane_angles.mean())
 
         # 두 방향 차이가 120도 이상이면 역주행 간주
         angle_diff = abs(avg_vehicle_angle - avg_lane_angle)
@@ -344,44 +271,20 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
 
         return angle_diff > angle_diff_threshold
 
-    def detect_tailgating(self, min_distance_threshold=50, min_close_frames=10, sample_rate=3):
+    def detect_tailgating(self, min_distance_threshold=50, min_close_frames=10):
         """
         안전거리 미확보 판단 (고속도로 등)
-        - 차량 중심 간 거리 계산
+        - 차량 중심 간 거리 계산 (SAMPLING_REQUIREMENTS 의 3프레임 간격)
         - 일정 거리 미만이 일정 프레임 이상 유지되면 True 반환
         """
 
-        from math import hypot
-
-        close_frame_count = 0
-
-        for i in range(0, len(self.frames), sample_rate):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-            centers = []
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck", "bus"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx = (x1 + x2) // 2
-                    cy = (y1 + y2) // 2
-                    centers.append((cx, cy))
-
-            if len(centers) < 2:
-                continue
-
-            # 가장 가까운 두 차량 거리 계산
-            min_dist = float("inf")
-            for i in range(len(centers)):
-                for j in range(i + 1, len(centers)):
-                    d = hypot(centers[i][0] - centers[j][0], centers[i][1] - centers[j][1])
-                    if d < min_dist:
-                        min_dist = d
-
-            if min_dist < min_distance_threshold:
-                close_frame_count += 1
+        # 프레임별 가장 가까운 두 차량 거리
+        min_dists = np.array([
+            features.min_pairwise_distance(self.trajectories.centers_at(i, VEHICLES)[1])
+            for i in self.frame_indices("detect_tailgating")
+        ])
 
+        close_frame_count = int(np.count_nonzero(min_dists < min_distance_threshold))
         return close_frame_count >= min_close_frames
 
     def detect_turn_duty_violation(self, angle_threshold=40, proximity_threshold=100, min_turn_frames=3, close_count_required=3):
@@ -396,13 +299,6 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
 
         print("[회전 중 주의의무 위반 판단]")
 
-        from math import atan2, degrees, hypot
-
-        prev_center = None
-        prev_angle = None
-        turn_frame_count = 0
-        close_counts = {}  # 차량 ID별 근접 카운트
-
         # optional: 선진입 여부 확인
         prior_entry_result = self.detect_prior_entry()
         if prior_entry_result == "판단불가" or prior_entry_result == "미적용":
@@ -411,48 +307,24 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         if prior_entry_result is True:
             return False  # 내가 선진입이면 회전 중 위반 책임 없음
 
-        for i in range(1, len(self.frames), 3):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            my_center = None
-            other_centers = {}
-            tracked_objects = self.tracker.update([])  # Norfair 추적기 유지용
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                    # 첫 번째 차량 = 본 차량
-                    if my_center is None:
-                        my_center = (cx, cy)
-                    else:
-                        # 차선 기준 거리상 가장 먼 2번째 차량들 추적용
-                        other_centers[len(other_centers)] = (cx, cy)
-
-            if prev_center and my_center:
-                dx = my_center[0] - prev_center[0]
-                dy = my_center[1] - prev_center[1]
-                angle = degrees(atan2(dy, dx))
-
-                if prev_angle is not None:
-                    delta = abs(angle - prev_angle)
-                    if delta > angle_threshold:
-                        turn_frame_count += 1
-
-                        # 근접 차량 추적 (프레임마다)
-                        for track_id, (ox, oy) in other_centers.items():
-                            dist = hypot(ox - my_center[0], oy - my_center[1])
-                            if dist < proximity_threshold:
-                                if track_id not in close_counts:
-                                    close_counts[track_id] = 1
-                                else:
-                                    close_counts[track_id] += 1
-
-                prev_angle = angle
-            prev_center = my_center
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return False
+        ego = ego.select(self.frame_indices("detect_turn_duty_violation"))
+
+        # 연속 구간 간 방향 변화량 → 회전 프레임 (변화량 i 는 frames[i + 2] 시점)
+        turn_mask = features.heading_changes(ego.centers) > angle_threshold
+        turn_frame_count = int(np.count_nonzero(turn_mask))
+        close_counts = {}  # 차량 ID별 근접 카운트
+
+        # 회전 중 근접 차량 추적 (Norfair 추적 ID 기준)
+        for k in np.nonzero(turn_mask)[0] + 2:
+            frame_idx = int(ego.frames[k])
+            track_ids, centers = self.trajectories.centers_at(frame_idx, ["car", "truck"])
+            others = track_ids != ego.track_id
+            close = features.distances_to(ego.centers[k], centers[others]) < proximity_threshold
+            for track_id in track_ids[others][close].tolist():
+                close_counts[track_id] = close_counts.get(track_id, 0) + 1
 
         # 특정 차량과 3프레임 이상 근접 유지되었는지 확인
         for count in close_counts.values():
@@ -468,47 +340,22 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         - 그 상태에서 일정 프레임 이상 근접 차량이 존재할 경우 위반 간주
         """
 
-        from math import hypot
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return False
+        ego = ego.select(self.frame_indices("detect_illegal_lane_change"))
 
-        prev_cx = None
-        lane_change_count = 0
-        close_frame_count = 0
+        # 진로 변경 감지 (수평 방향 변화량, 변화량 i 는 frames[i + 1] 시점)
+        change_steps = np.nonzero(features.lateral_shifts(ego.centers) > dx_threshold)[0] + 1
+        lane_change_count = len(change_steps)
 
-        for i in range(1, len(self.frames), 3):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            my_center = None
-            others = []
-
-            # 차량 중심점 추출
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx = (x1 + x2) // 2
-                    cy = (y1 + y2) // 2
-
-                    if my_center is None:
-                        my_center = (cx, cy)
-                    else:
-                        others.append((cx, cy))
-
-            # 진로 변경 감지 (수평 방향 변화량)
-            if prev_cx is not None and my_center:
-                dx = abs(my_center[0] - prev_cx)
-                if dx > dx_threshold:
-                    lane_change_count += 1
-
-                    # 근접 차량 존재 여부 체크
-                    for ox, oy in others:
-                        dist = hypot(ox - my_center[0], oy - my_center[1])
-                        if dist < proximity_threshold:
-                            close_frame_count += 1
-                            break  # 프레임당 1건만 체크
-
-            if my_center:
-                prev_cx = my_center[0]
+        # 근접 차량 존재 여부 체크 (프레임당 1건)
+        close_frame_count = 0
+        for k in change_steps:
+            track_ids, centers = self.trajectories.centers_at(int(ego.frames[k]), ["car", "truck"])
+            dists = features.distances_to(ego.centers[k], centers[track_ids != ego.track_id])
+            if np.any(dists < proximity_threshold):
+                close_frame_count += 1
 
         return lane_change_count >= min_change_frames and close_frame_count >= min_close_frames
 
@@ -519,112 +366,65 @@ class VehicleToVehicleAnalyzer(BaseAccidentAnalyzer):
         - 진입 차량이 먼저 본선 위치에 진입하면 위반으로 간주
         """
 
-        from math import hypot
-
-        entry_frames = []
-        min_distance_frames = 0
-
-        for i in range(1, len(self.frames), 3):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            centers = []
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    centers.append((cx, cy))
-
-            if len(centers) < 2:
-                continue
-
-            # 거리 측정
-            dist = hypot(centers[0][0] - centers[1][0], centers[0][1] - centers[1][1])
-            if dist < merge_distance_threshold:
-                min_distance_frames += 1
-                entry_frames.append(i)
+        frames, _, centers = self.trajectories.centers_in(
+            self.frame_indices("detect_merge_yield_violation"), ["car", "truck"]
+        )
+        # 차량이 2대 이상인 프레임마다 앞의 두 차량 사이 거리
+        _, starts, counts = np.unique(frames, return_index=True, return_counts=True)
+        starts = starts[counts >= 2]
+        dists = features.paired_distances(centers[starts], centers[starts + 1])
+        min_distance_frames = int(np.count_nonzero(dists < merge_distance_threshold))
 
         # 일정 프레임 이상 거리 가까웠고, 비교적 초기에 겹침 → 진입차가 양보 안했을 가능성
-        if min_distance_frames >= entry_lead_threshold:
-            return True
-        return False
+        return min_distance_frames >= entry_lead_threshold
 
     def detect_unclear_lane_entry(self, dx_threshold=40, proximity_threshold=100, overlap_frame_min=5):
         """
         좁은 도로/골목길에서 선진입 불분명 판단
-        - 2대 차량이 동시에 일정 dx로 움직이고, 가까운 거리 유지
+        - 2대 차량(같은 추적 ID)이 동시에 일정 dx로 움직이고, 가까운 거리 유지
         """
 
-        from math import hypot
-
-        prev_positions = []
-        overlap_count = 0
-
-        for i in range(1, len(self.frames), 3):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            centers = []
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    centers.append((cx, cy))
-
-            if len(centers) != 2:
-                continue  # 판단은 2대일 때만 수행
-
-            if prev_positions:
-                dx1 = abs(centers[0][0] - prev_positions[0][0])
-                dx2 = abs(centers[1][0] - prev_positions[1][0])
-
-                dist = hypot(centers[0][0] - centers[1][0], centers[0][1] - centers[1][1])
-
-                # 동시에 비슷한 거리 이동 + 서로 가까움
-                if dx1 > dx_threshold and dx2 > dx_threshold and dist < proximity_threshold:
-                    overlap_count += 1
-
-            prev_positions = centers
-
-        return overlap_count >= overlap_frame_min
+        frames, track_ids, centers = self.trajectories.centers_in(
+            self.frame_indices("detect_unclear_lane_entry"), ["car", "truck"]
+        )
+        # 판단은 2대일 때만 수행 (같은 프레임 안은 track_id 순이라 두 차량이 프레임마다 같은 순서)
+        _, starts, counts = np.unique(frames, return_index=True, return_counts=True)
+        starts = starts[counts == 2]
+        ids = np.stack([track_ids[starts], track_ids[starts + 1]], axis=1)
+        first, second = centers[starts], centers[starts + 1]
+
+        # 직전 2대 프레임과 같은 차량들일 때 각 차량의 수평 이동량과 두 차량 사이 거리
+        same_pair = np.all(ids[1:] == ids[:-1], axis=1)
+        dx1 = np.abs(first[1:, 0] - first[:-1, 0])
+        dx2 = np.abs(second[1:, 0] - second[:-1, 0])
+        dist = features.paired_distances(first[1:], second[1:])
+
+        # 동시에 비슷한 거리 이동 + 서로 가까움
+        overlap = same_pair & (dx1 > dx_threshold) & (dx2 > dx_threshold) & (dist < proximity_threshold)
+        return int(np.count_nonzero(overlap)) >= overlap_frame_min
 
     def detect_abrupt_maneuvering(self, delta_threshold=50, count_threshold=3, min_frames_between=3):
         """
         돌발운전 판단 (급차선 변경, 급정지 등)
-        - 중심 좌표 변화량이 일정 이상 → 급격한 조작으로 간주
+        - 본 차량 궤적의 중심 좌표 변화량이 일정 이상 → 급격한 조작으로 간주
         - 일정 프레임 간격마다 변화 확인
         - 일정 횟수 이상 발생 시 True 반환
         """
 
-        from math import hypot
+        ego = self.trajectories.ego_track()
+        if ego is None:
+            return False
+        ego = ego.select(self.frame_indices("detect_abrupt_maneuvering"))
 
-        prev_center = None
+        # 급격한 변화가 발생한 프레임 (변화량 i 는 frames[i + 1] 시점)
+        abrupt_frames = ego.frames[1:][features.step_distances(ego.centers) > delta_threshold]
+
+        # 급격한 변화가 최소 프레임 간격 이상 떨어졌을 경우에만 카운트
         abrupt_count = 0
         last_abrupt_frame = -min_frames_between  # 초기값: 충분히 이전
+        for i in abrupt_frames.tolist():
+            if (i - last_abrupt_frame) >= min_frames_between:
+                abrupt_count += 1
+                last_abrupt_frame = i
 
-        for i in range(1, len(self.frames), 3):
-            frame = self.frames[i]
-            results = self.model.predict(frame, verbose=False)[0]
-
-            for box in results.boxes:
-                cls = int(box.cls[0])
-                if self.model.names[cls] in ["car", "truck"]:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                    if prev_center is not None:
-                        dist = hypot(cx - prev_center[0], cy - prev_center[1])
-
-                        # 급격한 변화가 최소 프레임 간격 이상 떨어졌을 경우에만 카운트
-                        if dist > delta_threshold and (i - last_abrupt_frame) >= min_frames_between:
-                            abrupt_count += 1
-                            last_abrupt_frame = i
-
-                    prev_center = (cx, cy)
-                    break  # 차량 1대만 추적
-
-        return abrupt_count >= count_threshold
+        return abrupt_count >= count_threshold
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Pinecone 사고 사례 인덱스 → 로컬 스냅샷(.npz) 내보내기
+
+- 네임스페이스별로 index.list() 로 id 를 페이지 단위로 받고, index.fetch() 로 벡터/메타데이터 일괄 조회
+- 벡터는 float16, 메타데이터(situation_text, final_ratio, related ...)는 JSON 테이블로 저장 (LocalVectorIndex 형식)
+- 기본은 전체 조회 (기존 id 의 벡터/메타데이터 수정도 반영)
+- --incremental: 기존 스냅샷에 없는 id 만 조회하고 인덱스에서 삭제된 id 는 제거
+  (Pinecone list() 는 수정 여부를 알려주지 않으므로 기존 id 의 벡터/메타데이터 변경은 반영되지 않음)
+- 임시 파일에 쓴 뒤 교체하므로 읽는 쪽은 항상 완전한 스냅샷을 봄
+
+실행 예:
+    python -m app.tools.export_index                        # 전체 갱신 (LOCAL_INDEX_PATH)
+    python -m app.tools.export_index --incremental          # 새 id 추가 / 삭제된 id 제거만
+    python -m app.tools.export_index --namespace vehicle_to_vehicle --output data/accident_cases.npz
+"""
+import argparse
+import os
+import time
+import numpy as np
+from pinecone import Pinecone
+from app.utils.local_index import LocalVectorIndex, LOCAL_INDEX_PATH
+
+PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+PINECONE_INDEX = os.getenv("PINECONE_INDEX") or "accident-cases"
+LIST_PAGE_SIZE = 100
+FETCH_BATCH_SIZE = 100
+
+
+def list_namespaces(index) -> list:
+    stats = index.describe_index_stats()
+    namespaces = stats.namespaces if hasattr(stats, "namespaces") else stats["namespaces"]
+    return list(namespaces)
+
+
+def list_ids(index, namespace: str) -> list:
+    """
+    네임스페이스의 전체 id (페이지 단위 조회)
+    """
+    ids = []
+    for page in index.list(namespace=namespace, limit=LIST_PAGE_SIZE):
+        ids.extend(page)
+    return ids
+
+
+def fetch_vectors(index, namespace: str, ids: list):
+    """
+    id 묶음 단위로 벡터/메타데이터 조회 - (id, values, metadata) 순회
+    """
+    for start in range(0, len(ids), FETCH_BATCH_SIZE):
+        batch = ids[start:start + FETCH_BATCH_SIZE]
+        response = index.fetch(ids=batch, namespace=namespace)
+        vectors = response.vectors if hasattr(response, "vectors") else response["vectors"]
+        for vector_id in batch:
+            vector = vectors.get(vector_id)
+            if vector is None:
+                continue  # 조회 사이에 삭제된 id
+            yield vector_id, vector.values, dict(vector.metadata or {})
+
+
+def export_index(index, output: str, namespaces: list = None, incremental: bool = False, dtype: str = "float16",
+                 index_name: str = PINECONE_INDEX) -> dict:
+    """
+    스냅샷 생성/갱신 후 통계 반환
+    - incremental=True 면 기존 스냅샷에 있는 id 는 다시 조회하지 않음 (기존 id 의 수정 사항은 반영 안 됨)
+    - 내보내지 않는 네임스페이스는 기존 스냅샷 내용 유지
+    """
+    started = time.perf_counter()
+
+    existing = {}
+    if os.path.exists(output):
+        snapshot = LocalVectorIndex.load(output)
+        for namespace, vector_id, vector, metadata in snapshot.records():
+            existing[(namespace, vector_id)] = (vector, metadata)
+
+    namespaces = namespaces or list_namespaces(index)
+    records = {}
+    stats = {"fetched": 0, "reused": 0, "removed": 0}
+
+    for namespace in namespaces:
+        ids = list_ids(index, namespace)
+        print(f"[{namespace}] {len(ids)}건")
+
+        missing = []
+        for vector_id in ids:
+            if incremental and (namespace, vector_id) in existing:
+                records[(namespace, vector_id)] = existing[(namespace, vector_id)]
+                stats["reused"] += 1
+            else:
+                missing.append(vector_id)
+
+        for vector_id, values, metadata in fetch_vectors(index, namespace, missing):
+            records[(namespace, vector_id)] = (np.asarray(values, dtype=np.float32), metadata)
+            stats["fetched"] += 1
+
+    # 내보내기 대상 네임스페이스에서 사라진 id 는 제거, 나머지 네임스페이스는 유지
+    for (namespace, vector_id), record in existing.items():
+        if namespace not in namespaces:
+            records[(namespace, vector_id)] = record
+        elif (namespace, vector_id) not in records:
+            stats["removed"] += 1
+
+    keys = sorted(records)
+    vectors = np.stack([np.asarray(records[key][0], dtype=np.float32) for key in keys]) if keys else np.empty((0, 0))
+    snapshot = LocalVectorIndex(
+        [vector_id for _, vector_id in keys],
+        [namespace for namespace, _ in keys],
+        vectors,
+        [records[key][1] for key in keys],
+    )
+    snapshot.save(output, dtype=dtype, source_index=index_name, exported_at=time.time())
+
+    stats["total"] = len(keys)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pinecone 인덱스를 로컬 스냅샷으로 내보내기")
+    parser.add_argument("--index", default=PINECONE_INDEX, help="Pinecone 인덱스 이름")
+    parser.add_argument("--output", default=LOCAL_INDEX_PATH, help="스냅샷 경로 (.npz)")
+    parser.add_argument("--namespace", action="append", help="내보낼 네임스페이스 (기본: 전체)")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="기존 스냅샷에 없는 id 만 조회 (기존 id 의 벡터/메타데이터 수정은 반영되지 않음)",
+    )
+    parser.add_argument("--dtype", default="float16", choices=["float16", "float32"], help="벡터 저장 형식")
+    args = parser.parse_args(argv)
+
+    index = Pinecone(api_key=PINECONE_API_KEY).Index(args.index)
+    stats = export_index(index, args.output, args.namespace, args.incremental, args.dtype, args.index)
+    print(
+        f"[스냅샷 저장] {args.output} - 전체 {stats['total']}건 "
+        f"(조회 {stats['fetched']}, 재사용 {stats['reused']}, 삭제 {stats['removed']}) {stats['seconds']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
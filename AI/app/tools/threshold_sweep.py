@@ -0,0 +1,477 @@
+"""
+detect_* 임계값 일괄 탐색 (저장된 탐지 결과 기반)
+
+- 라벨링된 영상 목록(manifest)을 읽어 영상별 저장된 탐지 결과(detections/)로 analyzer 구성
+- detector 마다 임계값과 무관한 특징(거리/속도/각도 배열 등)을 영상당 한 번만 추출
+- 임계값 조합 격자 전체를 NumPy 브로드캐스팅 한 번으로 판정 후 정확도/소요 시간 보고
+  (돌발운전은 샘플 간격이 최소 간격보다 좁으면 프레임 순서로 한 번 훑으며 격자 전체를 함께 판정)
+
+manifest 형식 (JSON 리스트):
+    [{"video_path": "uploaded_videos/<id>.mp4", "accident_type": "차대차", "road_type": "고속도로",
+      "labels": {"detect_tailgating": true, "detect_abrupt_maneuvering": false}}]
+
+실행 예:
+    python -m app.tools.threshold_sweep manifest.json
+    python -m app.tools.threshold_sweep manifest.json --detectors detect_tailgating \\
+        --param detect_tailgating.min_distance_threshold=30,40,50,60,80
+    python -m app.tools.threshold_sweep manifest.json --build   # 탐지 결과가 없는 영상은 새로 분석해 저장
+"""
+import argparse
+import json
+import time
+import numpy as np
+from app.services import features
+from app.services.analysis_runner import analyzer_class
+from app.services.detection_archive import DetectionArchive, ArchiveMiss
+from app.services.model_registry import DEFAULT_MODEL_NAME
+from app.services.traffic_light import COLOR_RATIO_THRESHOLD
+from app.services.vehicle_to_vehicle import VEHICLES
+
+
+class DetectorSweep:
+    """
+    detector 하나의 임계값 탐색 정의
+    - grid: 파라미터 이름 → 후보 값 목록 (defaults 는 현재 코드의 기본값)
+    - extract(analyzer): 임계값과 무관한 특징 dict (판단 불가면 None)
+    - evaluate(feature, params): 격자 shape 의 파라미터 배열 → 같은 shape 의 bool 판정 배열
+    """
+
+    def __init__(self, accident_type: str, grid: dict, defaults: dict, extract, evaluate):
+        self.accident_type = accident_type
+        self.grid = grid
+        self.defaults = defaults
+        self.extract = extract
+        self.evaluate = evaluate
+
+
+def _ego(analyzer, detector_name: str):
+    ego = analyzer.trajectories.ego_track()
+    if ego is None:
+        return None
+    return ego.select(analyzer.frame_indices(detector_name))
+
+
+def _signal_entry_features(analyzer, detector_name: str, labels: list, require_lights: bool):
+    """
+    프레임별 최대 red_ratio + 대상(차량/보행자) 하단 진입 여부
+    """
+    indices = list(analyzer.frame_indices(detector_name))
+    timeline = analyzer.traffic_lights
+    if require_lights and not timeline.has_lights(indices):
+        return None
+
+    frame_height = analyzer.frames.shape[0]
+    red_ratios = np.full(len(indices), -np.inf)
+    entered = np.zeros(len(indices), dtype=bool)
+    for k, idx in enumerate(indices):
+        rows = timeline.rows_at(idx)
+        if len(rows):
+            red_ratios[k] = rows["red_ratio"].max()
+        bboxes = analyzer.trajectories.rows_at(idx, labels)["bbox"]
+        entered[k] = bool(np.any(bboxes[:, 3] > frame_height * 0.8)) if len(bboxes) else False
+
+    return {"indices": np.array(indices), "red_ratios": red_ratios, "entered": entered}
+
+
+def _evaluate_signal_entry(feature, params):
+    """
+    detect_signal_violation / detect_pedestrian_signal_violation 의 프레임 순회 로직을 격자 단위로 재현
+    - 빨간불과 진입이 모두 처음 관측된 시점에서 (마지막 진입 프레임 >= 마지막 빨간불 프레임) 이면 위반
+    """
+    indices = feature["indices"]
+    threshold = params["red_ratio_threshold"]
+    if not len(indices):
+        return np.zeros(threshold.shape, dtype=bool)
+
+    red = feature["red_ratios"] > threshold[..., None]
+    last_red = np.maximum.accumulate(np.where(red, indices, -1), axis=-1)
+    last_entry = np.maximum.accumulate(np.where(feature["entered"], indices, -1))
+    both = (last_red >= 0) & (last_entry >= 0)
+
+    stop = np.argmax(both, axis=-1)
+    red_at_stop = np.take_along_axis(last_red, stop[..., None], axis=-1)[..., 0]
+    return both.any(axis=-1) & (last_entry[stop] >= red_at_stop)
+
+
+def _extract_tailgating(analyzer):
+    min_dists = np.array([
+        features.min_pairwise_distance(analyzer.trajectories.centers_at(i, VEHICLES)[1])
+        for i in analyzer.frame_indices("detect_tailgating")
+    ])
+    return {"min_dists": min_dists}
+
+
+def _evaluate_tailgating(feature, params):
+    close = feature["min_dists"] < params["min_distance_threshold"][..., None]
+    return np.count_nonzero(close, axis=-1) >= params["min_close_frames"]
+
+
+def _extract_illegal_lane_change(analyzer):
+    ego = _ego(analyzer, "detect_illegal_lane_change")
+    if ego is None:
+        return {"shifts": np.empty(0), "nearest": np.empty(0)}
+
+    # 변화량 i 는 frames[i + 1] 시점 - 그 시점의 가장 가까운 다른 차량 거리
+    nearest = []
+    for k in range(1, len(ego)):
+        track_ids, centers = analyzer.trajectories.centers_at(int(ego.frames[k]), ["car", "truck"])
+        dists = features.distances_to(ego.centers[k], centers[track_ids != ego.track_id])
+        nearest.append(dists.min() if len(dists) else np.inf)
+
+    return {"shifts": features.lateral_shifts(ego.centers), "nearest": np.array(nearest)}
+
+
+def _evaluate_illegal_lane_change(feature, params):
+    change = feature["shifts"] > params["dx_threshold"][..., None]
+    close = change & (feature["nearest"] < params["proximity_threshold"][..., None])
+    return (
+        (np.count_nonzero(change, axis=-1) >= params["min_change_frames"])
+        & (np.count_nonzero(close, axis=-1) >= params["min_close_frames"])
+    )
+
+
+def _extract_abrupt_maneuvering(analyzer):
+    ego = _ego(analyzer, "detect_abrupt_maneuvering")
+    if ego is None:
+        return {"steps": np.empty(0), "frames": np.empty(0, dtype=np.int32)}
+    return {"steps": features.step_distances(ego.centers), "frames": ego.frames[1:]}
+
+
+def _evaluate_abrupt_maneuvering(feature, params, min_frames_between=3):
+    abrupt = feature["steps"] > params["delta_threshold"][..., None]
+    frames = feature["frames"]
+
+    if np.all(np.diff(frames) >= min_frames_between):
+        # 샘플 간격이 최소 간격 이상이면 급변 프레임이 모두 카운트됨
+        counts = np.count_nonzero(abrupt, axis=-1)
+    else:
+        # 최소 간격 규칙은 직전에 카운트한 프레임에 의존 → 프레임 순서로 한 번 훑으며 격자 전체를 함께 갱신
+        counts = np.zeros(abrupt.shape[:-1], dtype=np.int64)
+        last = np.full(counts.shape, -min_frames_between, dtype=np.int64)
+        for k, frame in enumerate(frames.tolist()):
+            counted = abrupt[..., k] & (frame - last >= min_frames_between)
+            counts += counted
+            last = np.where(counted, frame, last)
+
+    return counts >= params["count_threshold"]
+
+
+def _extract_wrong_direction(analyzer):
+    ego = analyzer.trajectories.ego_track()
+    if ego is None:
+        return None
+    ego = ego.select(analyzer.frame_indices("detect_wrong_direction_driving"))
+    vehicle_angles = features.headings(ego.centers, skip_stationary=True)
+    lane_angles = analyzer.road_geometry.lane_angles(max_abs_angle=45)
+    if not len(vehicle_angles) or not len(lane_angles):
+        return None
+
+    angle_diff = abs(float(vehicle_angles.mean()) - float(lane_angles.mean()))
+    return {"angle_diff": min(angle_diff, 360 - angle_diff)}
+
+
+def _extract_mean_speed(detector_name: str):
+    def extract(analyzer):
+        ego = _ego(analyzer, detector_name)
+        return {"speed": 0.0 if ego is None else features.mean_speed(ego.centers)}
+    return extract
+
+
+def _extract_protection_duty(analyzer):
+    ego = _ego(analyzer, "detect_pedestrian_protection_duty")
+    if ego is None:
+        return {"nearest": np.empty(0), "avg_speed": np.empty(0)}
+
+    keep = []
+    nearest = []
+    for i, vehicle_center in zip(ego.frames.tolist(), ego.centers):
+        _, pedestrians = analyzer.trajectories.centers_at(i, ["person"])
+        keep.append(len(pedestrians) > 0)
+        nearest.append(features.distances_to(vehicle_center, pedestrians).min() if len(pedestrians) else np.inf)
+
+    keep = np.array(keep, dtype=bool)
+    nearest = np.array(nearest)[keep]
+    speeds = features.step_distances(ego.centers[keep])
+    avg_speed = np.zeros(len(nearest))
+    avg_speed[1:] = np.cumsum(speeds) / np.arange(1, len(speeds) + 1)
+    return {"nearest": nearest, "avg_speed": avg_speed}
+
+
+def _evaluate_protection_duty(feature, params):
+    near = feature["nearest"] < params["proximity_threshold"][..., None]
+    fast = feature["avg_speed"] > params["speed_threshold"][..., None]
+    return np.any(near & fast, axis=-1)
+
+
+def _extract_low_visibility(analyzer):
+    brightness = analyzer.frame_brightness(analyzer.frame_indices("detect_low_visibility_condition"))
+    return {"brightness": float(brightness.mean()) if len(brightness) else 255.0}
+
+
+SWEEPS = {
+    "detect_signal_violation": DetectorSweep(
+        "차대차",
+        grid={"red_ratio_threshold": [0.1, 0.2, 0.5, 1, 2, 5, 10, 25, 50]},
+        defaults={"red_ratio_threshold": COLOR_RATIO_THRESHOLD},
+        extract=lambda a: _signal_entry_features(a, "detect_signal_violation", VEHICLES, require_lights=True),
+        evaluate=_evaluate_signal_entry,
+    ),
+    "detect_tailgating": DetectorSweep(
+        "차대차",
+        grid={"min_distance_threshold": [20, 30, 40, 50, 60, 80, 100, 120], "min_close_frames": [3, 5, 10, 15, 20, 30]},
+        defaults={"min_distance_threshold": 50, "min_close_frames": 10},
+        extract=_extract_tailgating,
+        evaluate=_evaluate_tailgating,
+    ),
+    "detect_illegal_lane_change": DetectorSweep(
+        "차대차",
+        grid={
+            "dx_threshold": [20, 30, 40, 50, 60, 80],
+            "proximity_threshold": [50, 80, 100, 150],
+            "min_change_frames": [1, 2, 3, 5],
+            "min_close_frames": [1, 2, 3, 5],
+        },
+        defaults={"dx_threshold": 50, "proximity_threshold": 80, "min_change_frames": 3, "min_close_frames": 3},
+        extract=_extract_illegal_lane_change,
+        evaluate=_evaluate_illegal_lane_change,
+    ),
+    "detect_abrupt_maneuvering": DetectorSweep(
+        "차대차",
+        grid={"delta_threshold": [20, 30, 40, 50, 60, 80, 100], "count_threshold": [1, 2, 3, 5, 8]},
+        defaults={"delta_threshold": 50, "count_threshold": 3},
+        extract=_extract_abrupt_maneuvering,
+        evaluate=_evaluate_abrupt_maneuvering,
+    ),
+    "detect_wrong_direction_driving": DetectorSweep(
+        "차대차",
+        grid={"angle_diff_threshold": [60, 90, 100, 110, 120, 135, 150, 165]},
+        defaults={"angle_diff_threshold": 120},
+        extract=_extract_wrong_direction,
+        evaluate=lambda f, p: f["angle_diff"] > p["angle_diff_threshold"],
+    ),
+    "detect_slow_driving_obligation": DetectorSweep(
+        "차대차",
+        grid={"speed_threshold": [2, 5, 8, 10, 12, 15, 20, 30]},
+        defaults={"speed_threshold": 10.0},
+        extract=_extract_mean_speed("detect_slow_driving_obligation"),
+        evaluate=lambda f, p: f["speed"] > p["speed_threshold"],
+    ),
+    "detect_pedestrian_signal_violation": DetectorSweep(
+        "차대보행자",
+        grid={"red_ratio_threshold": [0.1, 0.2, 0.5, 1, 2, 5, 10, 25, 50]},
+        defaults={"red_ratio_threshold": COLOR_RATIO_THRESHOLD},
+        extract=lambda a: _signal_entry_features(a, "detect_pedestrian_signal_violation", ["person"], require_lights=False),
+        evaluate=_evaluate_signal_entry,
+    ),
+    "detect_pedestrian_protection_duty": DetectorSweep(
+        "차대보행자",
+        grid={"proximity_threshold": [50, 80, 100, 150, 200], "speed_threshold": [2, 5, 8, 10, 15, 20]},
+        defaults={"proximity_threshold": 100, "speed_threshold": 10},
+        extract=_extract_protection_duty,
+        evaluate=_evaluate_protection_duty,
+    ),
+    "detect_vehicle_slow_duty": DetectorSweep(
+        "차대보행자",
+        grid={"speed_threshold": [2, 5, 8, 10, 12, 15, 20, 30]},
+        defaults={"speed_threshold": 10.0},
+        extract=_extract_mean_speed("detect_vehicle_slow_duty"),
+        evaluate=lambda f, p: f["speed"] > p["speed_threshold"],
+    ),
+    "detect_low_visibility_condition": DetectorSweep(
+        "차대보행자",
+        grid={"brightness_threshold": [20, 30, 40, 50, 60, 70, 80, 100]},
+        defaults={"brightness_threshold": 50},
+        extract=_extract_low_visibility,
+        evaluate=lambda f, p: f["brightness"] < p["brightness_threshold"],
+    ),
+}
+
+
+def _extract_archived(clip: dict, targets: list):
+    """
+    저장된 탐지 결과로 특징 추출 - (특징 dict, 결과가 부족한 detector 목록), 저장된 결과가 없으면 None
+    """
+    analyzer_cls = analyzer_class(clip["accident_type"])
+    archive = DetectionArchive.load(DetectionArchive.path_for(clip["video_path"], DEFAULT_MODEL_NAME, analyzer_cls))
+    if archive is None:
+        return None
+
+    analyzer = analyzer_cls(clip["video_path"], clip["accident_type"], clip["road_type"], archive=archive)
+    extracted = {}
+    missing = []
+    for name in targets:
+        try:
+            analyzer.plan_sampling([name])  # 저장된 프레임/클래스로 충분한지 확인
+            extracted[name] = SWEEPS[name].extract(analyzer)
+        except ArchiveMiss as e:
+            print(f"[저장된 탐지 결과 부족] {clip['video_path']} {name}: {e}")
+            missing.append(name)
+    return extracted, missing
+
+
+def _extract_from_video(clip: dict, targets: list) -> dict:
+    """
+    영상 + 모델로 특징 추출 후 탐지 결과 저장 (--build)
+    """
+    analyzer_cls = analyzer_class(clip["accident_type"])
+    analyzer = analyzer_cls(clip["video_path"], clip["accident_type"], clip["road_type"])
+    try:
+        analyzer.plan_sampling(targets)
+        extracted = {name: SWEEPS[name].extract(analyzer) for name in targets}
+        DetectionArchive.save(analyzer, DetectionArchive.path_for(clip["video_path"], DEFAULT_MODEL_NAME, analyzer_cls))
+        return extracted
+    finally:
+        analyzer.frames.release()
+
+
+def extract_features(clips: list, detector_names: list, build: bool = False) -> dict:
+    """
+    detector 별 [(특징, 정답 라벨)] 목록과 추출 시간
+    """
+    extracted = {name: {"samples": [], "seconds": 0.0, "skipped": 0} for name in detector_names}
+
+    for clip in clips:
+        targets = [
+            name for name in detector_names
+            if name in clip.get("labels", {}) and SWEEPS[name].accident_type == clip["accident_type"]
+        ]
+        if not targets:
+            continue
+
+        started = time.perf_counter()
+        archived = _extract_archived(clip, targets)
+        clip_features, missing = archived if archived is not None else ({}, targets)
+
+        if missing and build:
+            clip_features = _extract_from_video(clip, targets)
+            missing = []
+        elif missing:
+            print(f"[건너뜀] {clip['video_path']} {', '.join(missing)} (--build 로 탐지 결과 생성 가능)")
+
+        seconds = (time.perf_counter() - started) / len(targets)
+        for name in targets:
+            if name in missing:
+                extracted[name]["skipped"] += 1
+                continue
+            extracted[name]["seconds"] += seconds
+            extracted[name]["samples"].append((clip_features[name], bool(clip["labels"][name])))
+
+    return extracted
+
+
+def sweep(name: str, samples: list, grid: dict) -> dict:
+    """
+    임계값 격자 전체에 대해 정확도 계산 (영상당 evaluate 한 번)
+    """
+    sweep_def = SWEEPS[name]
+    param_names = list(grid)
+    mesh = np.meshgrid(*[np.asarray(grid[p], dtype=np.float64) for p in param_names], indexing="ij")
+    params = dict(zip(param_names, mesh))
+
+    started = time.perf_counter()
+    correct = np.zeros(mesh[0].shape, dtype=np.int64)
+    evaluated = 0
+    abstained = 0
+    for feature, label in samples:
+        if feature is None:
+            abstained += 1  # 판단불가 - 정확도 계산에서 제외
+            continue
+        predictions = np.broadcast_to(sweep_def.evaluate(feature, params), correct.shape)
+        correct += predictions == label
+        evaluated += 1
+    seconds = time.perf_counter() - started
+
+    accuracy = correct / evaluated if evaluated else np.zeros(correct.shape)
+    order = np.argsort(-accuracy, axis=None, kind="stable")
+
+    def combo(flat_idx):
+        pos = np.unravel_index(flat_idx, accuracy.shape)
+        return {p: float(params[p][pos]) for p in param_names}, float(accuracy[pos])
+
+    default_accuracy = None
+    if all(sweep_def.defaults.get(p) in grid[p] for p in param_names):
+        pos = tuple(list(grid[p]).index(sweep_def.defaults[p]) for p in param_names)
+        default_accuracy = float(accuracy[pos])
+
+    return {
+        "detector": name,
+        "clips": evaluated,
+        "abstained": abstained,
+        "combinations": int(accuracy.size),
+        "evaluate_seconds": seconds,
+        "defaults": sweep_def.defaults,
+        "default_accuracy": default_accuracy,
+        "top": [dict(zip(("params", "accuracy"), combo(i))) for i in order[:5]],
+    }
+
+
+def parse_param_overrides(values: list, detector_names: list) -> dict:
+    """
+    "detector.param=v1,v2,v3" → {detector: {param: [v1, v2, v3]}}
+    - 탐색 대상이 아닌 detector, 기본 격자에 없는 파라미터, 숫자가 아닌 값이면 ValueError
+    """
+    overrides = {}
+    for value in values or []:
+        key, _, candidates = value.partition("=")
+        detector, _, param = key.partition(".")
+        if detector not in detector_names:
+            raise ValueError(f"탐색 대상이 아닌 detector: {value}")
+        if param not in SWEEPS[detector].grid:
+            raise ValueError(
+                f"{detector} 에 없는 파라미터: {param or value} (가능: {', '.join(SWEEPS[detector].grid)})"
+            )
+        try:
+            grid_values = [float(v) for v in candidates.split(",") if v]
+        except ValueError:
+            raise ValueError(f"후보 값은 숫자여야 합니다: {value}")
+        if not grid_values:
+            raise ValueError(f"후보 값이 없습니다: {value}")
+        overrides.setdefault(detector, {})[param] = grid_values
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 탐지 결과로 detect_* 임계값 격자 탐색")
+    parser.add_argument("manifest", help="라벨링된 영상 목록 JSON")
+    parser.add_argument("--detectors", nargs="*", default=None, help=f"탐색할 detector (기본: 전체 {len(SWEEPS)}개)")
+    parser.add_argument("--param", action="append", help="후보 값 지정: detector.param=v1,v2,...")
+    parser.add_argument("--build", action="store_true", help="탐지 결과가 없는 영상은 영상으로 분석 후 저장")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest, encoding="utf-8") as f:
+        clips = json.load(f)
+
+    detector_names = args.detectors or list(SWEEPS)
+    unknown = [name for name in detector_names if name not in SWEEPS]
+    if unknown:
+        parser.error(f"지원하지 않는 detector: {', '.join(unknown)}")
+    try:
+        overrides = parse_param_overrides(args.param, detector_names)
+    except ValueError as e:
+        parser.error(str(e))
+
+    extracted = extract_features(clips, detector_names, args.build)
+
+    reports = []
+    for name in detector_names:
+        grid = {**SWEEPS[name].grid, **overrides.get(name, {})}
+        report = sweep(name, extracted[name]["samples"], grid)
+        report["extract_seconds"] = extracted[name]["seconds"]
+        report["skipped"] = extracted[name]["skipped"]
+        reports.append(report)
+
+        print(f"\n[{name}] 영상 {report['clips']}개 (판단불가 {report['abstained']}, 건너뜀 {report['skipped']}), "
+              f"조합 {report['combinations']}개, 특징 추출 {report['extract_seconds']:.2f}s, 판정 {report['evaluate_seconds']:.3f}s")
+        if report["default_accuracy"] is not None:
+            print(f"  기본값 {report['defaults']} → 정확도 {report['default_accuracy']:.3f}")
+        for rank, top in enumerate(report["top"], 1):
+            print(f"  {rank}. {top['params']} → 정확도 {top['accuracy']:.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
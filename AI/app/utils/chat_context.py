@@ -0,0 +1,150 @@
+import json
+import os
+from app.utils.similarity_search import chat_completion_async
+
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET") or 3000)  # 요청 한 번의 prompt 토큰 상한
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS") or 3)  # 그대로 보낼 최근 턴 수 (질문 + 답변 = 1턴)
+CHAT_SUMMARY_BLOCK_TURNS = int(os.getenv("CHAT_SUMMARY_BLOCK_TURNS") or 2)  # 요약에 한 번에 합치는 턴 수
+CHAT_SUMMARY_RESERVE = int(os.getenv("CHAT_SUMMARY_RESERVE") or 400)  # 요약 예상 토큰
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL") or "gpt-4"
+
+SYSTEM_PROMPT = "당신은 교통사고 과실 판단 전문가입니다."
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 근사치 - 한글 1글자(UTF-8 3바이트) ≈ 1토큰, 영문은 실제보다 조금 크게 잡힘
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def count_message_tokens(messages: list) -> int:
+    # 메시지마다 role/구분자 몫으로 4토큰
+    return sum(estimate_tokens(message["content"]) + 4 for message in messages)
+
+
+def normalize_history(history: list) -> list:
+    """
+    클라이언트가 보낸 conversation_history 에서 user/assistant 메시지만 사용
+    """
+    messages = []
+    for entry in history or []:
+        if entry.get("role") in ("user", "assistant") and isinstance(entry.get("content"), str):
+            messages.append({"role": entry["role"], "content": entry["content"]})
+    return messages
+
+
+def stable_prefix(analysis: dict, explanation: str) -> list:
+    """
+    분석 결과/과실 예측은 대화 첫머리에 한 번만 (매 턴 같은 내용이라 OpenAI prompt 캐시 적중)
+    """
+    content = f"""{SYSTEM_PROMPT}
+
+    다음은 상담 중인 사용자의 교통사고 분석 결과와 과실 예측입니다:
+
+    분석결과 -> {json.dumps(analysis, ensure_ascii=False, sort_keys=True)}
+    해당 사고에 대한 과실예측 -> {explanation}
+
+    이 사고 분석 결과를 바탕으로, 사용자의 질문에 대해 교통사고 과실 판단 전문가로서 자연스럽고 정확하게 설명해 주세요.
+    대화는 지금이 처음 아니기 때문에 이전에도 대화하듯이 해도 됩니다 (인삿말은 필요 없음).
+    이전 대화 내용에서의 질문과 답변을 바탕으로, 사용자가 이해할 수 있도록 설명해 주세요.
+    참고로 사용자의 차량이 A이고, 상대 차량이 B입니다.
+    """
+    return [{"role": "system", "content": content}]
+
+
+class ChatContext:
+    """
+    후속 질문 대화 문맥 구성 - 대화가 길어져도 prompt 크기를 일정하게 유지
+    - 고정 prefix(분석 결과/과실 예측) + 이전 대화 요약 + 최근 N턴 원문 + 새 질문
+    - 오래된 대화는 block_turns 턴 단위로 요약에 합침 (이전 요약 + 다음 블록 → 새 요약)
+    - 요약과 요약에 합친 메시지 수(summary_upto)는 세션에 저장 → 다음 턴에는 새로 밀려난 블록만 요약
+    - token_budget 을 넘으면 최근 원문도 블록 단위로 요약에 합침
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CHAT_CONTEXT_TOKEN_BUDGET,
+        recent_turns: int = CHAT_RECENT_TURNS,
+        block_turns: int = CHAT_SUMMARY_BLOCK_TURNS,
+        summary_model: str = CHAT_SUMMARY_MODEL,
+    ):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.block_size = max(1, block_turns) * 2
+        self.summary_model = summary_model
+
+    def plan(self, prefix: list, history: list, message: str, summary_upto: int = 0):
+        """
+        (요약할 블록 목록, 그대로 보낼 최근 메시지)
+        - summary_upto: 이미 요약에 합친 메시지 수 (그 뒤 블록만 새로 요약)
+        """
+        n = len(history)
+        folded = max(0, n - self.recent_turns * 2) // self.block_size * self.block_size
+        folded = max(folded, summary_upto)
+        fixed = count_message_tokens(prefix) + estimate_tokens(message) + 4
+
+        while folded < n:
+            reserve = CHAT_SUMMARY_RESERVE if folded else 0
+            if fixed + reserve + count_message_tokens(history[folded:]) <= self.token_budget:
+                break
+            folded = min(n, folded + self.block_size)
+
+        blocks = [history[start:min(folded, start + self.block_size)] for start in range(summary_upto, folded, self.block_size)]
+        return blocks, history[folded:]
+
+    def _summary_messages(self, summary: str, block: list) -> list:
+        dialogue = "\n".join(
+            f"{'사용자' if entry['role'] == 'user' else '상담사'}: {entry['content']}" for entry in block
+        )
+        prompt = f"""
+    다음은 교통사고 과실 상담 대화의 이전 요약과 그 뒤에 이어진 대화입니다.
+    두 내용을 합쳐 새 요약을 작성해주세요.
+    사용자가 물어본 내용, 답변한 과실 판단과 근거, 사용자가 새로 알려준 사실은 빠뜨리지 마세요.
+    요약은 5문장 이내의 한국어로 작성해주세요.
+
+    이전 요약:
+    {summary or "없음"}
+
+    이어진 대화:
+    {dialogue}
+
+    새 요약:
+    """
+        return [{"role": "user", "content": prompt}]
+
+    def _assemble(self, prefix: list, summary: str, recent: list, message: str) -> list:
+        messages = list(prefix)
+        if summary:
+            messages.append({"role": "system", "content": f"이전 대화 요약: {summary}"})
+        messages.extend(recent)
+        messages.append({"role": "user", "content": message})
+
+        print(f"[대화 문맥] 요약 {'있음' if summary else '없음'}, 최근 메시지 {len(recent)}개, 약 {count_message_tokens(messages)} 토큰")
+        return messages
+
+    async def build_messages_async(self, analysis: dict, explanation: str, history: list, message: str,
+                                   summary: str = None, summary_upto: int = 0, state: dict = None) -> list:
+        """
+        GPT 에 보낼 메시지 목록
+        - summary / summary_upto: 세션에 저장된 이전 요약과 요약에 합친 메시지 수
+        - state 를 넘기면 갱신된 요약을 state["chat_summary"], state["summary_upto"] 에 기록 (세션 저장용)
+        """
+        prefix = stable_prefix(analysis, explanation)
+        history = normalize_history(history)
+        if not summary or not 0 < summary_upto <= len(history):
+            # 저장된 요약이 없거나 대화 기록과 맞지 않으면 처음부터 요약
+            summary, summary_upto = None, 0
+        blocks, recent = self.plan(prefix, history, message, summary_upto)
+
+        for block in blocks:
+            summary = (await chat_completion_async(
+                self._summary_messages(summary, block), model=self.summary_model, temperature=0
+            )).strip()
+        if state is not None:
+            state["chat_summary"] = summary
+            state["summary_upto"] = len(history) - len(recent)
+        return self._assemble(prefix, summary, recent, message)
+
+
+chat_context = ChatContext()
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+import numpy as np
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE") or 1024)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR")  # 지정 시 디스크에도 저장 (재시작 후 재사용)
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE") or "float32"  # float32 / float16
+
+
+def normalize_text(text: str) -> str:
+    """
+    유니코드 정규화 + 앞뒤 공백 제거 + 연속 공백 하나로
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    (모델, 정규화된 문장) → 임베딩 벡터 캐시
+    - 프로세스 내 LRU (max_entries 개)
+    - directory 지정 시 .npy 파일로도 저장 (float32 또는 float16)
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, directory: str = EMBEDDING_CACHE_DIR,
+                 dtype: str = EMBEDDING_CACHE_DTYPE):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str):
+        key = self.make_key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        vector = self._load(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, vector)
+        return vector
+
+    def put(self, model: str, text: str, vector):
+        key = self.make_key(model, text)
+        vector = np.asarray(vector, dtype=self.dtype)
+        with self._lock:
+            self._remember(key, vector)
+        self._store(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def _load(self, key: str):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path).astype(self.dtype, copy=False)
+        except (OSError, ValueError) as e:
+            print(f"[임베딩 캐시 읽기 실패] {path}: {e}")
+            return None
+
+    def _store(self, key: str, vector: np.ndarray):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, vector)
+        os.replace(tmp_path, path)
+
+
+embedding_cache = EmbeddingCache()
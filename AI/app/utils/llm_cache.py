@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE") or 512)  # 0 이면 캐시 사용 안 함
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL") or 24 * 60 * 60)  # 초
+
+
+class LLMCache:
+    """
+    GPT 응답 캐시 - (모델, messages, temperature) 가 같으면 저장된 응답 재사용
+    - ttl 초가 지난 항목은 만료
+    - max_entries 초과 시 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+    - hits / misses 카운터로 적중률 확인
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl: int = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, messages: list, temperature=None) -> str:
+        raw = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            ensure_ascii=False, sort_keys=True, default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,100 @@
+import json
+import os
+import uuid
+import numpy as np
+
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH") or os.path.join("data", "accident_cases.npz")
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class LocalVectorIndex:
+    """
+    사고 사례 코퍼스 로컬 벡터 인덱스 (Pinecone index.query 와 같은 형태로 응답)
+    - 스냅샷(.npz): ids, namespaces, vectors(float16/float32), metadata(JSON)
+    - 네임스페이스별로 정규화한 float32 행렬에 내적(코사인) 전수 탐색
+    """
+
+    def __init__(self, ids, namespaces, vectors, metadata: list, info: dict = None):
+        self.ids = np.asarray(ids)
+        self.namespaces = np.asarray(namespaces)
+        self.vectors = np.asarray(vectors)
+        self.metadata = metadata
+        self.info = info or {}
+
+        # 네임스페이스별 (행 번호, 단위 벡터 행렬)
+        self._groups = {}
+        for namespace in np.unique(self.namespaces).tolist():
+            rows = np.nonzero(self.namespaces == namespace)[0]
+            matrix = self.vectors[rows].astype(np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._groups[namespace] = (rows, matrix / np.maximum(norms, 1e-12))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path: str = LOCAL_INDEX_PATH) -> "LocalVectorIndex":
+        with np.load(path) as data:
+            info = json.loads(bytes(data["info"]).decode("utf-8"))
+            if info.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"지원하지 않는 스냅샷 형식입니다: {path}")
+            metadata = json.loads(bytes(data["metadata"]).decode("utf-8"))
+            index = cls(data["ids"], data["namespaces"], data["vectors"], metadata, info)
+
+        print(f"[로컬 벡터 인덱스 로딩] {path} ({len(index)}건)")
+        return index
+
+    def save(self, path: str = LOCAL_INDEX_PATH, dtype: str = "float16", **info):
+        """
+        스냅샷 저장 - 임시 파일에 쓴 뒤 교체
+        """
+        info = {**self.info, **info, "format_version": SNAPSHOT_FORMAT_VERSION}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    ids=self.ids.astype(str),
+                    namespaces=self.namespaces.astype(str),
+                    vectors=self.vectors.astype(dtype),
+                    metadata=np.frombuffer(json.dumps(self.metadata, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                    info=np.frombuffer(json.dumps(info, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def records(self):
+        """
+        (namespace, id, vector, metadata) 순회
+        """
+        for k in range(len(self.ids)):
+            yield str(self.namespaces[k]), str(self.ids[k]), self.vectors[k], self.metadata[k]
+
+    def query(self, vector, top_k: int = 1, namespace: str = "", include_metadata: bool = True, **kwargs) -> dict:
+        group = self._groups.get(namespace)
+        if group is None:
+            return {"matches": [], "namespace": namespace}
+
+        rows, matrix = group
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix @ query
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        matches = []
+        for k in best.tolist():
+            match = {"id": str(self.ids[rows[k]]), "score": float(scores[k])}
+            if include_metadata:
+                match["metadata"] = self.metadata[rows[k]]
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace}
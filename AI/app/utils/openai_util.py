@@ -1,8 +1,3 @@
-import openai
-import os
-
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
 VALID_ACCIDENT_TYPES = ["차대차", "차대보행자"]
 
 def generate_accident_type_question() -> str:
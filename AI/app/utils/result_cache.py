@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH") or os.path.join("cache", "analysis_results.sqlite3")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE") or 1024)  # 0 이면 캐시 사용 안 함
+
+
+class ResultCache:
+    """
+    분석 결과 영구 캐시 (SQLite)
+    - 키: (영상 해시, accident_type, road_type, 분석기/모델 버전)
+    - 값: /analyze/video 응답 JSON
+    - max_entries 초과 시 가장 오래 조회되지 않은 항목부터 삭제 (LRU)
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_entries: int = RESULT_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(video_hash: str, accident_type: str, road_type: str, version: str) -> str:
+        raw = json.dumps([video_hash, accident_type, road_type, version], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM results")
+            self.conn.commit()
+
+
+result_cache = ResultCache()
@@ -0,0 +1,199 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND") or "memory"  # memory / sqlite
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH") or os.path.join("cache", "sessions.sqlite3")
+SESSION_STORE_SIZE = int(os.getenv("SESSION_STORE_SIZE") or 1024)
+SESSION_TTL = int(os.getenv("SESSION_TTL") or 6 * 60 * 60)  # 초 (마지막 사용 시점부터)
+
+
+class SessionNotFound(Exception):
+    """
+    존재하지 않거나 만료된 session_id
+    """
+
+    def __init__(self, session_id: str):
+        super().__init__(f"존재하지 않거나 만료된 session_id 입니다: {session_id}")
+        self.session_id = session_id
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+class MemorySessionStore:
+    """
+    분석 세션 저장소 (프로세스 메모리)
+    - 값: analysis, situation_sentence, similar_case, explanation, question, uncertain_items, conversation_history,
+      chat_summary / summary_upto (대화 요약과 요약에 합친 메시지 수)
+    - 마지막 사용 후 ttl 초가 지나면 만료, max_entries 초과 시 가장 오래 사용하지 않은 세션부터 삭제 (LRU)
+    """
+
+    def __init__(self, max_entries: int = SESSION_STORE_SIZE, ttl: int = SESSION_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, state: dict) -> str:
+        session_id = new_session_id()
+        with self._lock:
+            self._entries[session_id] = (time.time() + self.ttl, copy.deepcopy(state))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(session_id, None)
+                return None
+            self._entries[session_id] = (time.time() + self.ttl, entry[1])
+            self._entries.move_to_end(session_id)
+            return copy.deepcopy(entry[1])
+
+    def update(self, session_id: str, **changes) -> dict:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(session_id, None)
+                raise SessionNotFound(session_id)
+            state = {**entry[1], **copy.deepcopy(changes)}
+            self._entries[session_id] = (time.time() + self.ttl, state)
+            self._entries.move_to_end(session_id)
+            return copy.deepcopy(state)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """
+    분석 세션 저장소 (SQLite) - 서버 재시작/여러 워커 프로세스 간 공유
+    - MemorySessionStore 와 같은 인터페이스, 값은 JSON 으로 저장
+    """
+
+    def __init__(self, path: str = SESSION_STORE_PATH, max_entries: int = SESSION_STORE_SIZE, ttl: int = SESSION_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            # 여러 워커 프로세스가 같은 파일을 쓰므로 WAL + 잠금 대기
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_accessed ON sessions (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def create(self, state: dict) -> str:
+        session_id = new_session_id()
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO sessions (session_id, state, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(state, ensure_ascii=False), now + self.ttl, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+        return session_id
+
+    def _load(self, session_id: str, now: float):
+        row = self.conn.execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND expires_at >= ?", (session_id, now)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            state = self._load(session_id, now)
+            if state is None:
+                return None
+            self.conn.execute(
+                "UPDATE sessions SET expires_at = ?, accessed_at = ? WHERE session_id = ?",
+                (now + self.ttl, now, session_id),
+            )
+            self.conn.commit()
+        return state
+
+    def update(self, session_id: str, **changes) -> dict:
+        now = time.time()
+        with self._lock:
+            state = self._load(session_id, now)
+            if state is None:
+                raise SessionNotFound(session_id)
+            state.update(changes)
+            self.conn.execute(
+                "UPDATE sessions SET state = ?, expires_at = ?, accessed_at = ? WHERE session_id = ?",
+                (json.dumps(state, ensure_ascii=False), now + self.ttl, now, session_id),
+            )
+            self.conn.commit()
+        return state
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        self.conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+        count = self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+def create_session_store(backend: str = SESSION_STORE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"지원하지 않는 세션 저장소입니다: {backend}")
+
+
+session_store = create_session_store()
+
+
+def load_session_payload(payload: dict) -> dict:
+    """
+    payload 에 session_id 가 있으면 세션에 저장된 값 위에 payload 로 보낸 값을 덮어쓴 dict
+    - session_id 가 없으면 payload 그대로 (기존처럼 전체 상태를 보내는 클라이언트)
+    - 만료/없는 세션이면 SessionNotFound
+    """
+    session_id = payload.get("session_id")
+    if not session_id:
+        return payload
+
+    state = session_store.get(session_id)
+    if state is None:
+        raise SessionNotFound(session_id)
+    state.update({key: value for key, value in payload.items() if value is not None})
+    return state
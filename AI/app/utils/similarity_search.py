@@ -1,24 +1,207 @@
 # app/utils/similarity_search.py
+import asyncio
 import os
-from openai import OpenAI
-from pinecone import Pinecone
+import re
+import threading
 from typing import List, Dict
 import json
+from app.utils.embedding_cache import embedding_cache
+from app.utils.llm_cache import llm_cache
+from app.utils.situation_templates import build_situation_sentence, SITUATION_SENTENCE_MODE
+from app.utils.local_index import LocalVectorIndex, LOCAL_INDEX_PATH
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX") or "accident-cases"
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
+EMBEDDING_MODEL = "text-embedding-3-large"
+# pinecone: Pinecone 서버 검색 / local: 로컬 스냅샷(LOCAL_INDEX_PATH) 인메모리 검색
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND") or "pinecone"
+# 비동기 OpenAI 클라이언트 커넥션 풀 (keep-alive 로 요청마다 TLS 연결을 새로 맺지 않음)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS") or 50)
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY") or 60)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT") or 60)
+
+_client = None
+_async_client = None
+_index = None
+_init_lock = threading.Lock()
+# auto 모드에서 템플릿으로 표현하지 못해 GPT 로 문장을 만든 횟수
+_template_fallbacks = 0
+_fallback_lock = threading.Lock()
+
+
+def get_client():
+    """
+    동기 OpenAI 클라이언트 (처음 사용할 때 생성)
+    """
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+
+def get_async_client():
+    """
+    비동기 OpenAI 클라이언트 (처음 사용할 때 생성, keep-alive 커넥션 풀 공유)
+    """
+    global _async_client
+    if _async_client is None:
+        with _init_lock:
+            if _async_client is None:
+                import httpx
+                from openai import AsyncOpenAI
+                _async_client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                        ),
+                        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=10.0),
+                    ),
+                )
+    return _async_client
+
+
+def get_index():
+    """
+    사고 사례 벡터 인덱스 (처음 사용할 때 연결/로딩)
+    - pinecone: Pinecone 인덱스 핸들 / local: 로컬 스냅샷
+    """
+    global _index
+    if _index is None:
+        with _init_lock:
+            if _index is None:
+                if VECTOR_BACKEND == "local":
+                    # index.query(...) 인터페이스가 같은 로컬 인덱스 (네트워크 없이 검색)
+                    _index = LocalVectorIndex.load(LOCAL_INDEX_PATH)
+                else:
+                    from pinecone import Pinecone
+                    _index = Pinecone(api_key=PINECONE_API_KEY).Index(PINECONE_INDEX)
+    return _index
+
+
+def warm_up_clients():
+    """
+    OpenAI 클라이언트 미리 생성 (openai/httpx import 비용을 첫 요청 대신 서버 시작 시 처리)
+    """
+    get_client()
+    get_async_client()
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 
-# Pinecone 초기화
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX)
+def _completion_kwargs(messages: list, model: str, temperature: float = None) -> dict:
+    kwargs = {"model": model, "messages": messages}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    return kwargs
 
-def convert_analysis_to_sentence(analysis: dict) -> str:
-    """분석 결과를 문장으로 변환"""
-    print("[분석 결과를 문장으로 변환]")
+
+def _cached_completion(key: str, use_cache: bool):
+    if not use_cache:
+        return None
+    cached = llm_cache.get(key)
+    if cached is not None:
+        print("[GPT 응답 캐시 사용]")
+    return cached
+
+
+def chat_completion(messages: list, model: str = "gpt-4", temperature: float = None, use_cache: bool = True) -> str:
+    """GPT 호출 (같은 모델/메시지/temperature 면 캐시된 응답 사용, use_cache=False 면 새로 생성)"""
+    key = llm_cache.make_key(model, messages, temperature)
+    cached = _cached_completion(key, use_cache)
+    if cached is not None:
+        return cached
+
+    response = get_client().chat.completions.create(**_completion_kwargs(messages, model, temperature))
+
+    content = response.choices[0].message.content
+    llm_cache.put(key, content)
+    return content
+
+
+async def chat_completion_async(messages: list, model: str = "gpt-4", temperature: float = None,
+                                use_cache: bool = True) -> str:
+    """chat_completion 비동기 버전 (같은 캐시 공유)"""
+    key = llm_cache.make_key(model, messages, temperature)
+    cached = _cached_completion(key, use_cache)
+    if cached is not None:
+        return cached
+
+    response = await get_async_client().chat.completions.create(**_completion_kwargs(messages, model, temperature))
+
+    content = response.choices[0].message.content
+    llm_cache.put(key, content)
+    return content
+
+
+async def stream_chat_completion(messages: list, model: str = "gpt-4", temperature: float = None,
+                                 use_cache: bool = True):
+    """
+    GPT 응답 스트리밍 - ("delta", {"content": 조각}) 을 도착하는 대로 넘기고 마지막에 ("done", {...})
+    - done: 전체 응답(content), 토큰 사용량(usage), 캐시 사용 여부(cached)
+    - 캐시된 응답은 한 번에 전달, 끝까지 받은 응답은 캐시에 저장
+    """
+    key = llm_cache.make_key(model, messages, temperature)
+    cached = _cached_completion(key, use_cache)
+    if cached is not None:
+        yield "delta", {"content": cached}
+        yield "done", {"content": cached, "usage": None, "cached": True}
+        return
+
+    stream = await get_async_client().chat.completions.create(
+        **_completion_kwargs(messages, model, temperature),
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parts = []
+    usage = None
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage.model_dump()
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield "delta", {"content": chunk.choices[0].delta.content}
+    finally:
+        # 클라이언트 연결이 끊겨 중단돼도 OpenAI 응답 스트림은 닫음
+        await stream.close()
+
+    content = "".join(parts)
+    llm_cache.put(key, content)
+    yield "done", {"content": content, "usage": usage, "cached": False}
+
+
+def _template_sentence(analysis: dict, mode: str = None):
+    """
+    GPT 호출 없이 템플릿으로 만든 문장 (None 이면 GPT 로 생성)
+    - template: 항상 템플릿 문장 (GPT 호출 없음)
+    - auto: 템플릿으로 표현할 수 없으면 None, GPT 로 넘긴 횟수는 template_fallback_count()
+    """
+    global _template_fallbacks
+    mode = mode or SITUATION_SENTENCE_MODE
+    if mode == "template":
+        return build_situation_sentence(analysis)
+    if mode == "auto":
+        sentence = build_situation_sentence(analysis, strict=True)
+        if sentence is None:
+            with _fallback_lock:
+                _template_fallbacks += 1
+                count = _template_fallbacks
+            print(f"[템플릿으로 표현할 수 없는 분석 결과 - GPT 로 문장 생성] 누적 {count}회")
+        return sentence
+    return None
+
+
+def template_fallback_count() -> int:
+    return _template_fallbacks
+
+
+def _sentence_messages(analysis: dict) -> list:
     factor_list = []
     for key, value in analysis.items():
         if isinstance(value, bool):
@@ -38,26 +221,59 @@ def convert_analysis_to_sentence(analysis: dict) -> str:
 
     상황 설명:
     """
+    return [{"role": "user", "content": prompt}]
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.5
-    )
-
-    return response.choices[0].message.content.strip()
 
+def convert_analysis_to_sentence(analysis: dict, use_cache: bool = True, mode: str = None) -> str:
+    """분석 결과를 문장으로 변환 (mode: gpt / template / auto, 기본값은 SITUATION_SENTENCE_MODE)"""
+    print("[분석 결과를 문장으로 변환]")
+    sentence = _template_sentence(analysis, mode)
+    if sentence is not None:
+        return sentence
 
-def query_similar_cases(situation_sentence: str, top_k: int = 1) -> list:
-    print("[유사 사고 찾는 중]")
-    embedding_response = client.embeddings.create(
-        input=[situation_sentence],
-        model="text-embedding-3-large"
-    )
-    embedding = embedding_response.data[0].embedding
+    content = chat_completion(_sentence_messages(analysis), temperature=0.5, use_cache=use_cache)
+    return content.strip()
 
-    results = index.query(namespace="vehicle_to_vehicle",vector=embedding, top_k=top_k, include_metadata=True)
 
+async def convert_analysis_to_sentence_async(analysis: dict, use_cache: bool = True, mode: str = None) -> str:
+    print("[분석 결과를 문장으로 변환]")
+    sentence = _template_sentence(analysis, mode)
+    if sentence is not None:
+        return sentence
+
+    content = await chat_completion_async(_sentence_messages(analysis), temperature=0.5, use_cache=use_cache)
+    return content.strip()
+
+
+def embed_text(text: str, model: str = EMBEDDING_MODEL) -> list:
+    """문장 임베딩 (같은 문장은 캐시에서 재사용)"""
+    vector = embedding_cache.get(model, text)
+    if vector is None:
+        embedding_response = get_client().embeddings.create(
+            input=[text],
+            model=model
+        )
+        vector = embedding_cache.put(model, text, embedding_response.data[0].embedding)
+    else:
+        print("[임베딩 캐시 사용]")
+    return vector.astype("float32").tolist()
+
+
+async def embed_text_async(text: str, model: str = EMBEDDING_MODEL) -> list:
+    # 캐시 디렉터리를 쓰면 .npy 파일을 읽고 쓰므로 이벤트 루프 밖에서 실행
+    vector = await asyncio.to_thread(embedding_cache.get, model, text)
+    if vector is None:
+        embedding_response = await get_async_client().embeddings.create(
+            input=[text],
+            model=model
+        )
+        vector = await asyncio.to_thread(embedding_cache.put, model, text, embedding_response.data[0].embedding)
+    else:
+        print("[임베딩 캐시 사용]")
+    return vector.astype("float32").tolist()
+
+
+def _to_cases(results) -> list:
     cases = []
     for match in results["matches"]:
         case = {
@@ -80,9 +296,27 @@ def query_similar_cases(situation_sentence: str, top_k: int = 1) -> list:
     return cases
 
 
-def generate_fault_explanation_gpt(query_summary: str, similar_case: dict) -> str:
-    print("[답변 생성 중]")
-    """OpenAI를 통한 설명 생성"""
+def query_similar_cases(situation_sentence: str, top_k: int = 1) -> list:
+    print("[유사 사고 찾는 중]")
+    embedding = embed_text(situation_sentence)
+
+    results = get_index().query(namespace="vehicle_to_vehicle",vector=embedding, top_k=top_k, include_metadata=True)
+    return _to_cases(results)
+
+
+async def query_similar_cases_async(situation_sentence: str, top_k: int = 1) -> list:
+    print("[유사 사고 찾는 중]")
+    embedding = await embed_text_async(situation_sentence)
+
+    # Pinecone 클라이언트(urllib3 커넥션 풀)/로컬 인덱스 연결과 검색은 동기 호출이라 스레드에서 실행
+    index = await asyncio.to_thread(get_index)
+    results = await asyncio.to_thread(
+        index.query, namespace="vehicle_to_vehicle", vector=embedding, top_k=top_k, include_metadata=True
+    )
+    return _to_cases(results)
+
+
+def _explanation_messages(query_summary: str, similar_case: dict) -> list:
     situation = similar_case.get("situation", "")
     ratio = similar_case.get("final_ratio", "")
     related = similar_case.get("related", "")
@@ -102,18 +336,30 @@ def generate_fault_explanation_gpt(query_summary: str, similar_case: dict) -> st
     유사 판례는 답변 마지막에 깔끔하게 정리해서 주세요.
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "당신은 교통사고 분석 전문가입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
-    return response.choices[0].message.content
+    return [
+        {"role": "system", "content": "당신은 교통사고 분석 전문가입니다."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate_fault_explanation_gpt(query_summary: str, similar_case: dict, use_cache: bool = True) -> str:
+    print("[답변 생성 중]")
+    """OpenAI를 통한 설명 생성"""
+    return chat_completion(_explanation_messages(query_summary, similar_case), use_cache=use_cache)
+
+
+async def generate_fault_explanation_gpt_async(query_summary: str, similar_case: dict, use_cache: bool = True) -> str:
+    print("[답변 생성 중]")
+    return await chat_completion_async(_explanation_messages(query_summary, similar_case), use_cache=use_cache)
+
 
+def stream_fault_explanation_gpt(query_summary: str, similar_case: dict, use_cache: bool = True):
+    """generate_fault_explanation_gpt 스트리밍 버전 (stream_chat_completion 이벤트 순회)"""
+    print("[답변 생성 중 (스트리밍)]")
+    return stream_chat_completion(_explanation_messages(query_summary, similar_case), use_cache=use_cache)
 
-def generate_fault_response_gpt(query_summary: str, similar_case: dict) -> str:
+
+def _response_messages(query_summary: str, similar_case: dict) -> list:
     situation = similar_case.get("situation", "")
     ratio = similar_case.get("final_ratio", "")
     score = similar_case.get("score", 0)
@@ -141,18 +387,22 @@ def generate_fault_response_gpt(query_summary: str, similar_case: dict) -> str:
 
     --- 사용자에게 전달할 답변 시작 ---
     """
+    return [{"role": "user", "content": prompt}]
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.6
-    )
 
-    return response.choices[0].message.content.strip()
+def generate_fault_response_gpt(query_summary: str, similar_case: dict, use_cache: bool = True) -> str:
+    content = chat_completion(_response_messages(query_summary, similar_case), temperature=0.6, use_cache=use_cache)
+    return content.strip()
 
 
-def generate_question_gpt(analysis: dict, uncertain_items: list) -> str:
-    """판독불가 항목에 대한 질문을 GPT로 생성"""
+async def generate_fault_response_gpt_async(query_summary: str, similar_case: dict, use_cache: bool = True) -> str:
+    content = await chat_completion_async(
+        _response_messages(query_summary, similar_case), temperature=0.6, use_cache=use_cache
+    )
+    return content.strip()
+
+
+def _question_messages(analysis: dict, uncertain_items: list) -> list:
     prompt = f"""
     다음은 교통사고 분석 결과입니다. 판독불가 항목에 대해 사용자에게 물어볼 질문을 생성해주세요.
 
@@ -166,19 +416,22 @@ def generate_question_gpt(analysis: dict, uncertain_items: list) -> str:
     질문은 하나의 문장으로 작성해주세요.
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "당신은 교통사고 분석 전문가입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
-    return response.choices[0].message.content
+    return [
+        {"role": "system", "content": "당신은 교통사고 분석 전문가입니다."},
+        {"role": "user", "content": prompt}
+    ]
 
 
-def update_analysis_with_answer(analysis: dict, answer: str, uncertain_items: list) -> dict:
-    """사용자의 응답을 기반으로 분석 결과 업데이트"""
+def generate_question_gpt(analysis: dict, uncertain_items: list, use_cache: bool = True) -> str:
+    """판독불가 항목에 대한 질문을 GPT로 생성"""
+    return chat_completion(_question_messages(analysis, uncertain_items), use_cache=use_cache)
+
+
+async def generate_question_gpt_async(analysis: dict, uncertain_items: list, use_cache: bool = True) -> str:
+    return await chat_completion_async(_question_messages(analysis, uncertain_items), use_cache=use_cache)
+
+
+def _update_messages(analysis: dict, answer: str, uncertain_items: list) -> list:
     prompt = f"""
     다음은 교통사고 분석 결과와 사용자의 응답입니다.
     사용자의 응답을 바탕으로 분석 결과를 업데이트해주세요.
@@ -202,19 +455,15 @@ def update_analysis_with_answer(analysis: dict, answer: str, uncertain_items: li
     }}
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "당신은 교통사고 분석 전문가입니다. JSON 형식으로만 응답해주세요."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
+    return [
+        {"role": "system", "content": "당신은 교통사고 분석 전문가입니다. JSON 형식으로만 응답해주세요."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _merge_updated_analysis(content: str, analysis: dict, uncertain_items: list) -> dict:
     try:
-        # 응답에서 JSON 부분만 추출
-        content = response.choices[0].message.content
         # JSON 형식의 문자열을 찾아서 파싱
-        import re
         json_str = re.search(r'\{.*\}', content, re.DOTALL).group()
         updated_analysis = json.loads(json_str)
         
@@ -230,3 +479,29 @@ def update_analysis_with_answer(analysis: dict, answer: str, uncertain_items: li
         print(f"Raw response: {content}")
         # 오류 발생 시 원본 분석 결과 반환
         return analysis
+
+
+def update_analysis_with_answer(analysis: dict, answer: str, uncertain_items: list) -> dict:
+    """사용자의 응답을 기반으로 분석 결과 업데이트"""
+    response = get_client().chat.completions.create(
+        model="gpt-4",
+        messages=_update_messages(analysis, answer, uncertain_items)
+    )
+    # 응답에서 JSON 부분만 추출
+    return _merge_updated_analysis(response.choices[0].message.content, analysis, uncertain_items)
+
+
+async def update_analysis_with_answer_async(analysis: dict, answer: str, uncertain_items: list) -> dict:
+    response = await get_async_client().chat.completions.create(
+        model="gpt-4",
+        messages=_update_messages(analysis, answer, uncertain_items)
+    )
+    return _merge_updated_analysis(response.choices[0].message.content, analysis, uncertain_items)
+
+
+async def close_async_clients():
+    """서버 종료 시 비동기 클라이언트 커넥션 풀 정리"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -0,0 +1,99 @@
+import os
+import re
+
+# gpt: GPT 로 문장 생성 (기존 방식) / template: 로컬 템플릿 / auto: 템플릿으로 표현 가능하면 템플릿, 아니면 GPT
+SENTENCE_MODES = ["gpt", "template", "auto"]
+SITUATION_SENTENCE_MODE = os.getenv("SITUATION_SENTENCE_MODE") or "gpt"
+# 문장으로 만들 항목이 하나도 없을 때 template 모드에서 쓰는 고정 문장
+NEUTRAL_SENTENCE = "사고 당시 확인된 과실 요소는 없었습니다."
+
+# 분석 항목 → (True 일 때, False 일 때) 문장 조각 ("~고" / "~습니다" 로 이어 붙임)
+BOOL_TEMPLATES = {
+    # 차대차 (VehicleToVehicleAnalyzer)
+    "신호위반": ("신호를 위반했", "신호를 지켰"),
+    "선진입 여부": ("교차로에 먼저 진입했", "교차로에 나중에 진입했"),
+    "회전 중 주의의무 위반": ("회전 중 주의의무를 위반했", "회전 중 주의의무를 지켰"),
+    "역주행 여부": ("역주행했", "정방향으로 주행했"),
+    "진로변경 위반": ("무리하게 진로를 변경했", "진로변경 위반은 없었"),
+    "돌발운전 여부": ("급차선 변경이나 급정지 같은 돌발운전을 했", "돌발운전은 없었"),
+    "안전거리 미확보": ("앞차와의 안전거리를 확보하지 않았", "앞차와의 안전거리를 확보했"),
+    "중앙선 침범": ("중앙선을 침범했", "중앙선을 침범하지 않았"),
+    "선진입 불분명": ("상대 차량과 거의 동시에 진입해 선진입이 불분명했", "선진입 관계는 분명했"),
+    # 차대보행자 (VehicleToPedestrianAnalyzer)
+    "보행자 신호 위반": ("보행자가 적색 신호에 횡단했", "보행자는 신호를 지켰"),
+    "무단횡단 여부": ("보행자가 무단횡단했", "보행자의 무단횡단은 없었"),
+    "보호 의무 위반": ("보행자 근처에서 감속하지 않아 보호 의무를 위반했", "보행자 근처에서 감속해 보호 의무를 지켰"),
+    "서행 여부": ("서행하지 않았", "서행했"),
+    "야간/시야장애 조건": ("야간 또는 시야장애 상황이었", "시야가 확보된 상황이었"),
+    "보호구역 내 사고": ("어린이 보호구역 안에서 사고가 났", "보호구역 밖에서 사고가 났"),
+}
+
+# 값이 고정 문자열인 항목
+TEXT_TEMPLATES = {
+    "보도/차도 구분 없음": "보도와 차도의 구분이 없는 도로였",
+    "고속도로 보행자 과실": "고속도로에서 보행자가 차도에 진입했",
+}
+NO_SLOW_DUTY = "서행 의무가 없는 도로였"
+
+
+def _topic_particle(word: str) -> str:
+    """
+    받침 유무에 따라 은/는
+    """
+    last = word[-1]
+    if "가" <= last <= "힣" and (ord(last) - ord("가")) % 28:
+        return "은"
+    return "는"
+
+
+def _clause(key: str, value):
+    """
+    분석 항목 하나 → 문장 조각 (건너뛸 항목은 "", 템플릿으로 표현할 수 없으면 None)
+    """
+    if isinstance(value, bool):
+        if key in BOOL_TEMPLATES:
+            return BOOL_TEMPLATES[key][0 if value else 1]
+        return f"{key}{_topic_particle(key)} {'있었' if value else '없었'}"
+
+    if not isinstance(value, str):
+        return None
+
+    if value.startswith("미적용") or key == "오류":
+        return ""
+    if "판단불가" in value or "판단 불가" in value:
+        return f"{key}{_topic_particle(key)} 판단할 수 없었"
+    if key in TEXT_TEMPLATES:
+        return TEXT_TEMPLATES[key]
+    if value == "서행 의무 없음":
+        return NO_SLOW_DUTY
+
+    # 신호등 미탐지 시 서행 판단 fallback ("신호등 없음, 서행 판단 기준: True")
+    match = re.match(r"신호등 없음, 서행 판단 기준: (True|False)", value)
+    if match:
+        if match.group(1) == "True":
+            return "신호등이 없는 곳에서 서행하지 않았"
+        return "신호등이 없는 곳에서 서행했"
+
+    return None
+
+
+def build_situation_sentence(analysis: dict, strict: bool = False):
+    """
+    분석 결과 → 상황 설명 한 문장 (GPT 호출 없이 템플릿으로 생성)
+    - strict=True 면 템플릿으로 표현할 수 없는 항목이 있거나 표현할 항목이 없을 때 None
+    - strict=False 면 항상 문장 반환 (표현할 항목이 없으면 NEUTRAL_SENTENCE)
+    """
+    clauses = []
+    for key, value in analysis.items():
+        clause = _clause(key, value)
+        if clause is None:
+            if strict:
+                return None
+            continue
+        if clause:
+            clauses.append(clause)
+
+    if not clauses:
+        return None if strict else NEUTRAL_SENTENCE
+
+    return "사고 당시 " + "고, ".join(clauses) + "습니다."
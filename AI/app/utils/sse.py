@@ -0,0 +1,31 @@
+import json
+from fastapi.responses import StreamingResponse
+
+
+def format_sse(event: str, data) -> str:
+    """
+    SSE 이벤트 한 개 (data 는 한 줄 JSON)
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _encode_events(events):
+    try:
+        async for event, data in events:
+            yield format_sse(event, data)
+    except Exception as e:
+        # 스트리밍 도중 오류는 HTTP 상태 대신 error 이벤트로 전달
+        print(f"[스트리밍 오류] {e}")
+        yield format_sse("error", {"error": str(e)})
+
+
+def sse_response(events) -> StreamingResponse:
+    """
+    (event, data) 비동기 순회 → text/event-stream 응답
+    - 프록시(nginx) 버퍼링을 꺼서 토큰이 도착하는 대로 전달
+    """
+    return StreamingResponse(
+        _encode_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
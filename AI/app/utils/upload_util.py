@@ -0,0 +1,48 @@
+from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
+import hashlib
+import os
+import uuid
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE") or 1024 * 1024)  # 1MB
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE") or 500 * 1024 * 1024)  # 500MB
+
+
+async def save_upload_stream(upload: UploadFile, dest_path: str, max_size: int = MAX_UPLOAD_SIZE) -> dict:
+    """
+    업로드 파일을 고정 크기 청크로 디스크에 저장하면서 SHA-256 해시 계산
+    - 전체 파일을 메모리에 올리지 않음
+    - max_size 초과 시 중단하고 413 반환 (임시 파일 삭제)
+    - 임시 파일에 쓴 뒤 완료되면 dest_path 로 이름 변경
+    - 반환: {"sha256", "size", "path"}
+    """
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.part"
+    sha256 = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"업로드 파일이 최대 크기({max_size} bytes)를 초과했습니다.",
+                    )
+
+                sha256.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        await upload.close()
+
+    return {"sha256": sha256.hexdigest(), "size": size, "path": dest_path}
@@ -0,0 +1,58 @@
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+import glob
+import os
+import re
+import uuid
+from app.utils.upload_util import save_upload_stream
+
+VIDEO_STORE_DIR = os.getenv("VIDEO_STORE_DIR") or "uploaded_videos"
+VIDEO_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class VideoStore:
+    """
+    내용 주소 기반 영상 저장소
+    - video_id = 영상 SHA-256 해시, 파일명 = {video_id}{확장자}
+    - 같은 영상을 다시 올리면 새로 저장하지 않고 기존 파일 재사용
+    """
+
+    def __init__(self, root: str = VIDEO_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    async def save(self, upload: UploadFile) -> dict:
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}{ext}")
+        saved = await save_upload_stream(upload, tmp_path)
+
+        # 파일 조회/이동은 이벤트 루프 밖에서
+        video_path, duplicate = await run_in_threadpool(self._store, tmp_path, saved["sha256"], ext)
+        return {"video_id": saved["sha256"], "video_path": video_path, "size": saved["size"], "duplicate": duplicate}
+
+    def _store(self, tmp_path: str, video_id: str, ext: str):
+        """
+        임시 파일을 {video_id}{확장자} 로 옮김 - (저장 경로, 중복 여부)
+        """
+        existing = self.path(video_id)
+        if existing is not None:
+            # 중복 업로드 - 기존 파일 사용
+            os.remove(tmp_path)
+            return existing, True
+
+        filepath = os.path.join(self.root, f"{video_id}{ext}")
+        os.replace(tmp_path, filepath)
+        return filepath, False
+
+    def path(self, video_id: str):
+        """
+        video_id → 저장된 영상 경로 (없으면 None)
+        - 디렉터리를 조회하므로 async 핸들러에서는 run_in_threadpool 로 호출
+        """
+        if not video_id or not VIDEO_ID_PATTERN.match(video_id):
+            return None
+        matches = glob.glob(os.path.join(self.root, f"{video_id}*"))
+        return matches[0] if matches else None
+
+
+video_store = VideoStore()
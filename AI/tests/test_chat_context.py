@@ -0,0 +1,45 @@
+import asyncio
+from app.utils import chat_context as chat_context_module
+from app.utils.chat_context import ChatContext
+
+
+def test_stored_summary_folds_only_new_blocks(monkeypatch):
+    calls = []
+
+    async def fake_completion(messages, **kwargs):
+        calls.append(messages[0]["content"])
+        return f"요약{len(calls)}"
+
+    monkeypatch.setattr(chat_context_module, "chat_completion_async", fake_completion)
+    context = ChatContext(token_budget=100000, recent_turns=1, block_turns=1)
+
+    history, session = [], {}
+    for turn in range(8):
+        before = len(calls)
+        state = {}
+        messages = asyncio.run(context.build_messages_async(
+            {"신호위반": True}, "A 70 : B 30", history, f"질문{turn}",
+            summary=session.get("chat_summary"), summary_upto=session.get("summary_upto", 0), state=state,
+        ))
+        assert len(calls) - before <= 1  # 턴마다 새로 밀려난 블록만 요약
+        assert state["summary_upto"] == max(0, len(history) - 2)
+        session.update(state)
+        history += [{"role": "user", "content": f"질문{turn}"}, {"role": "assistant", "content": f"답변{turn}"}]
+
+    assert session["chat_summary"] == f"요약{len(calls)}"
+    assert messages[1]["content"] == f"이전 대화 요약: {session['chat_summary']}"
+
+
+def test_summary_restarts_when_history_does_not_match(monkeypatch):
+    async def fake_completion(messages, **kwargs):
+        return "새 요약"
+
+    monkeypatch.setattr(chat_context_module, "chat_completion_async", fake_completion)
+    context = ChatContext(token_budget=100000, recent_turns=1, block_turns=1)
+    history = [{"role": "user", "content": "질문"}, {"role": "assistant", "content": "답변"}] * 2
+
+    state = {}
+    asyncio.run(context.build_messages_async(
+        {}, "설명", history, "다음 질문", summary="예전 요약", summary_upto=10, state=state
+    ))
+    assert state == {"chat_summary": "새 요약", "summary_upto": 2}
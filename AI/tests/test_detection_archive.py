@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from app.services.detection_archive import DetectionArchive, ArchiveMiss, DETECTION_DTYPE
+from app.services.vehicle_to_vehicle import VehicleToVehicleAnalyzer
+
+NAMES = {0: "person", 2: "car", 3: "motorcycle", 5: "bus", 7: "truck", 9: "traffic light"}
+FRAME_COUNT = 90
+
+
+def boxes_at(idx):
+    # 본 차량은 천천히 오른쪽으로, 버스는 정지
+    x = 100 + idx
+    return [(2, (x, 380, x + 60, 440)), (5, (400, 100, 520, 200))]
+
+
+def make_analyzer(frames, classes, detector: str) -> VehicleToVehicleAnalyzer:
+    """
+    frames 에서 classes 만 탐지한 것처럼 만든 메모리 탐지 결과로 detector 샘플링 계획까지 수립
+    """
+    rows = [
+        (idx, -1, cls_id, 0.9, box)
+        for idx in frames
+        for cls_id, box in boxes_at(idx)
+        if classes is None or cls_id in classes
+    ]
+    class_mask = np.zeros(max(NAMES) + 1, dtype=bool)
+    class_mask[list(NAMES) if classes is None else classes] = True
+    meta = {
+        "frame_count": FRAME_COUNT,
+        "fps": 30.0,
+        "shape": [480, 640, 3],
+        "names": {str(cls_id): label for cls_id, label in NAMES.items()},
+        "classes": classes,
+    }
+    arrays = {
+        "detections": np.array(rows, dtype=DETECTION_DTYPE),
+        "inferred_frames": np.array(frames, dtype=np.int32),
+        "inferred_classes": np.tile(class_mask, (len(frames), 1)),
+    }
+    archive = DetectionArchive("memory", meta, arrays)
+    analyzer = VehicleToVehicleAnalyzer("clip.mp4", "차대차", "고속도로", archive=archive)
+    analyzer.plan_sampling([detector])
+    return analyzer
+
+
+def test_save_merges_runs_with_different_frames_and_classes(tmp_path):
+    path = str(tmp_path / "clip.yolov8n.VehicleToVehicleAnalyzer")
+    # 차/트럭만 offset 1 프레임에서 탐지한 분석, 전체 차량을 offset 0 프레임에서 탐지한 분석
+    DetectionArchive.save(make_analyzer(range(1, FRAME_COUNT, 3), [2, 7], "detect_abrupt_maneuvering"), path)
+    DetectionArchive.save(make_analyzer(range(0, FRAME_COUNT, 3), None, "detect_tailgating"), path)
+
+    archive = DetectionArchive.load(path)
+    archive.check_coverage(range(1, FRAME_COUNT, 3), [2, 7])
+    archive.check_coverage(range(0, FRAME_COUNT, 3), None)
+    with pytest.raises(ArchiveMiss):
+        archive.check_coverage(range(1, FRAME_COUNT, 3), [5])  # offset 1 프레임에서는 버스를 탐지하지 않음
+
+    assert len(archive.inferred_frames) == 60
+    assert len(archive.detections) == 30 + 60
+    assert archive.classes == [2, 7]
+
+    # 두 분석의 추적 ID 는 합친 프레임 전체로 다시 매겨짐
+    cars = archive.detections[archive.detections["cls"] == 2]
+    assert len(set(cars["track_id"].tolist())) == 1
+    assert (cars["track_id"] >= 0).all()
+
+
+def test_save_replaces_redetected_frames_without_duplicates(tmp_path):
+    path = str(tmp_path / "clip.yolov8n.VehicleToVehicleAnalyzer")
+    DetectionArchive.save(make_analyzer(range(1, FRAME_COUNT, 3), [2, 7], "detect_abrupt_maneuvering"), path)
+    DetectionArchive.save(make_analyzer(range(1, FRAME_COUNT, 3), [2, 7], "detect_abrupt_maneuvering"), path)
+
+    archive = DetectionArchive.load(path)
+    assert len(archive.inferred_frames) == 30
+    assert len(archive.detections) == 30
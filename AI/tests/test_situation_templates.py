@@ -0,0 +1,12 @@
+from app.utils.situation_templates import build_situation_sentence, NEUTRAL_SENTENCE
+
+
+def test_template_mode_always_returns_sentence():
+    assert build_situation_sentence({}) == NEUTRAL_SENTENCE
+    assert build_situation_sentence({"알 수 없는 항목": "값"}) == NEUTRAL_SENTENCE
+    assert build_situation_sentence({"신호위반": True}) == "사고 당시 신호를 위반했습니다."
+
+
+def test_strict_mode_leaves_unsupported_results_to_gpt():
+    assert build_situation_sentence({}, strict=True) is None
+    assert build_situation_sentence({"신호위반": True, "알 수 없는 항목": "값"}, strict=True) is None
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from app.services.detection_archive import DetectionArchive, DETECTION_DTYPE
+from app.services.vehicle_to_vehicle import VehicleToVehicleAnalyzer
+
+NAMES = {0: "person", 2: "car", 5: "bus", 7: "truck", 9: "traffic light"}
+FRAME_COUNT = 90
+FRAME_SHAPE = (480, 640, 3)
+
+
+def make_archive(boxes_at) -> DetectionArchive:
+    """
+    boxes_at(frame_idx) → [(cls, (x1, y1, x2, y2)), ...] 로 만든 메모리 탐지 결과 (추적 ID 없음)
+    """
+    rows = []
+    for idx in range(FRAME_COUNT):
+        for cls_id, box in boxes_at(idx):
+            rows.append((idx, -1, cls_id, 0.9, box))
+    meta = {
+        "frame_count": FRAME_COUNT,
+        "fps": 30.0,
+        "shape": list(FRAME_SHAPE),
+        "names": {str(cls_id): label for cls_id, label in NAMES.items()},
+        "classes": None,
+    }
+    arrays = {
+        "detections": np.array(rows, dtype=DETECTION_DTYPE),
+        "inferred_frames": np.arange(FRAME_COUNT, dtype=np.int32),
+        "inferred_classes": np.ones((FRAME_COUNT, max(NAMES) + 1), dtype=bool),
+    }
+    return DetectionArchive("memory", meta, arrays)
+
+
+def make_analyzer(boxes_at, road_type: str) -> VehicleToVehicleAnalyzer:
+    analyzer = VehicleToVehicleAnalyzer("clip.mp4", "차대차", road_type, archive=make_archive(boxes_at))
+    analyzer.plan_sampling(VehicleToVehicleAnalyzer.ROAD_TYPE_DETECTORS[road_type])
+    analyzer._trajectories = None  # 저장된 추적 ID 대신 탐지 결과로 다시 추적
+    return analyzer
+
+
+def ego_jumping(idx):
+    # 본 차량(화면 하단)이 10프레임마다 오른쪽으로 80px 급이동, 상대 차량은 정지
+    x = 100 + 80 * (idx // 10)
+    return [(2, (x, 380, x + 60, 440)), (2, (300, 150, 360, 200))]
+
+
+def ego_steady(idx):
+    x = 100 + idx
+    return [(2, (x, 380, x + 60, 440)), (2, (300, 150, 360, 200))]
+
+
+@pytest.mark.parametrize("road_type", ["교차로", "고속도로", "일반도로", "골목길"])
+def test_abrupt_maneuvering_detects_large_jumps(road_type):
+    analyzer = make_analyzer(ego_jumping, road_type)
+    assert analyzer.detect_abrupt_maneuvering() is True
+
+
+def test_abrupt_maneuvering_ignores_steady_motion():
+    analyzer = make_analyzer(ego_steady, "고속도로")
+    assert analyzer.detect_abrupt_maneuvering() is False
+
+
+def bus_below_cars(idx):
+    # 본 차량 A 가 먼저 진입선(y=288)을 넘고 B 는 나중에 진입, 화면 맨 아래에는 정차한 버스
+    a_y = 250 + 2 * idx
+    b_y = 100 + 5 * idx // 2
+    return [
+        (2, (200, a_y - 20, 260, a_y + 20)),
+        (2, (400, b_y - 20, 460, b_y + 20)),
+        (5, (20, 430, 140, 470)),
+    ]
+
+
+def test_prior_entry_ignores_vehicles_outside_entry_candidates():
+    analyzer = make_analyzer(bus_below_cars, "교차로")
+    assert analyzer.detect_prior_entry() is True
+
+
+def side_by_side(idx):
+    # 두 차량이 나란히 (80px 간격) 같은 속도로 오른쪽으로 진입
+    x = 20 * idx
+    return [(2, (x, 300, x + 60, 360)), (2, (x, 380, x + 60, 440))]
+
+
+def one_moving(idx):
+    x = 20 * idx
+    return [(2, (x, 300, x + 60, 360)), (2, (100, 380, 160, 440))]
+
+
+def test_unclear_lane_entry_requires_both_vehicles_moving_together():
+    assert make_analyzer(side_by_side, "골목길").detect_unclear_lane_entry() is True
+    assert make_analyzer(one_moving, "골목길").detect_unclear_lane_entry() is False